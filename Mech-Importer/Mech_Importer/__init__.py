@@ -0,0 +1,53 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+#
+
+# Mech Importer 2.0 (Blender Python module)
+# https://www.heffaypresents.com/GitHub
+
+if "bpy" in locals():
+    # Reloading the add-on: drop the submodules so they are imported fresh on next use.
+    import sys
+    for name in [name for name in sys.modules if name.startswith(__name__ + ".")]:
+        del sys.modules[name]
+
+try:
+    import bpy
+except ImportError:
+    # Outside Blender (tests, tools): only the modules that don't need bpy, like assets and convert.
+    bpy = None
+
+bl_info = {
+    "name": "Mech Importer", 
+    "category": "Import-Export",
+    'author': 'Geoff Gerber',
+    'version': (0, 1, 0),
+    'blender': (2, 7, 9),
+    'description': "Import MWO mechs",
+    "location": "File > Import-Export"
+    }
+
+def register():
+    from . import operators
+    operators.register()
+
+def unregister():
+    from . import operators
+    operators.unregister()
@@ -0,0 +1,200 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Collada animation clips imported as actions on the mech's rig.
+
+import array
+import bisect
+import collections
+import os
+import time
+import xml.etree.ElementTree as ET
+
+import bpy
+import mathutils
+
+COLLADA_NS = "{http://www.collada.org/2005/11/COLLADASchema}"
+
+def read_collada_matrix(values):
+    # Collada matrices are row major.
+    return mathutils.Matrix((values[0:4], values[4:8], values[8:12], values[12:16]))
+
+def read_collada_clip(filepath):
+    """ Reads the joints and baked transform channels of a Collada animation file.
+        Returns (joints, channels): joints maps bone name to (parent bone name, rest matrix
+        relative to the parent), parents first.  channels maps bone name to (key times,
+        parent relative matrices).
+    """
+    root = ET.parse(filepath).getroot()
+    sources = {}
+    for source in root.iter(COLLADA_NS + "source"):
+        values = source.find(COLLADA_NS + "float_array")
+        if values is not None and values.text:
+            sources[source.get("id")] = [float(x) for x in values.text.split()]
+
+    joints = collections.OrderedDict()
+    node_names = {}
+    def read_node(node, parent):
+        name = (node.get("name") or node.get("id")).replace(' ', '_')
+        node_names[node.get("id")] = name
+        matrix = node.find(COLLADA_NS + "matrix")
+        rest = read_collada_matrix([float(x) for x in matrix.text.split()]) if matrix is not None else mathutils.Matrix.Identity(4)
+        if node.get("type") == "JOINT":
+            joints[name] = (parent, rest)
+            parent = name
+        for child in node.findall(COLLADA_NS + "node"):
+            read_node(child, parent)
+    for scene in root.iter(COLLADA_NS + "visual_scene"):
+        for node in scene.findall(COLLADA_NS + "node"):
+            read_node(node, None)
+
+    samplers = {}
+    for sampler in root.iter(COLLADA_NS + "sampler"):
+        samplers[sampler.get("id")] = {i.get("semantic"): i.get("source").lstrip("#")
+                                       for i in sampler.findall(COLLADA_NS + "input")}
+    channels = {}
+    skipped = 0
+    for channel in root.iter(COLLADA_NS + "channel"):
+        node_id, _, attribute = channel.get("target").partition("/")
+        inputs = samplers.get(channel.get("source").lstrip("#"), {})
+        if attribute != "transform" or "INPUT" not in inputs or "OUTPUT" not in inputs:
+            # Only the baked matrix channels written by the converter are supported.
+            skipped += 1
+            continue
+        times = sources[inputs["INPUT"]]
+        values = sources[inputs["OUTPUT"]]
+        channels[node_names.get(node_id, node_id.replace(' ', '_'))] = (
+            times, [read_collada_matrix(values[i * 16:i * 16 + 16]) for i in range(len(times))])
+    if skipped:
+        print("    Skipped " + str(skipped) + " unsupported channels in " + filepath)
+    return joints, channels
+
+def get_parent_frame(bone, posed):
+    """ The armature space matrix a bone's basis is applied to, given the posed matrices of
+        its parents.  Follows Blender's rules for bones that don't inherit rotation.
+    """
+    if bone.parent is None:
+        return bone.matrix_local
+    offset = bone.parent.matrix_local.inverted() * bone.matrix_local
+    if bone.use_inherit_rotation:
+        return posed[bone.parent.name] * offset
+    location = (posed[bone.parent.name] * offset).to_translation()
+    return mathutils.Matrix.Translation(location) * bone.matrix_local.to_3x3().to_4x4()
+
+def get_bone_order(bones):
+    # Bones with their parents first.
+    order = []
+    def add(bone):
+        order.append(bone)
+        for child in bone.children:
+            add(child)
+    for bone in bones:
+        if bone.parent is None:
+            add(bone)
+    return order
+
+def set_fcurve_keys(action, data_path, index, group, frames, values):
+    # Fills a whole fcurve in one go instead of inserting keyframes one at a time.
+    fcurve = action.fcurves.new(data_path, index, group)
+    fcurve.keyframe_points.add(len(frames))
+    co = array.array('f', [0]) * (len(frames) * 2)
+    co[0::2] = array.array('f', frames)
+    co[1::2] = array.array('f', values)
+    fcurve.keyframe_points.foreach_set("co", co)
+    fcurve.update()
+    return fcurve
+
+def import_animation(filepath, armature, fps):
+    """ Creates an action on armature from a Collada animation clip.  Returns the action. """
+    joints, channels = read_collada_clip(filepath)
+    bones = armature.data.bones
+    times = sorted(set(t for key_times, matrices in channels.values() for t in key_times))
+
+    # Armature space rest matrices of the clip's joints, and how each differs from the
+    # Blender bone of the same name (the Collada importer reorients bones).
+    joint_rest = {}
+    for name, (parent, rest) in joints.items():
+        joint_rest[name] = joint_rest[parent] * rest if parent in joint_rest else rest
+    correction = {name: joint_rest[name].inverted() * bones[name].matrix_local
+                  for name in channels if name in bones and name in joint_rest}
+
+    order = get_bone_order(bones)
+    animated = [bone for bone in order if bone.name in channels]
+    locations = {bone.name: [] for bone in animated}
+    rotations = {bone.name: [] for bone in animated}
+    for t in times:
+        # Joint matrices at this time, holding the last key where a channel has none.
+        joint_pose = {}
+        for name, (parent, rest) in joints.items():
+            if name in channels:
+                key_times, matrices = channels[name]
+                local = matrices[max(bisect.bisect_right(key_times, t) - 1, 0)]
+            else:
+                local = rest
+            joint_pose[name] = joint_pose[parent] * local if parent in joint_pose else local
+        posed = {}
+        for bone in order:
+            frame = get_parent_frame(bone, posed)
+            if bone.name in locations:
+                target = joint_pose[bone.name] * correction.get(bone.name, mathutils.Matrix.Identity(4))
+                basis = frame.inverted() * target
+                posed[bone.name] = target
+                rotation = basis.to_quaternion()
+                previous = rotations[bone.name][-1] if rotations[bone.name] else None
+                if previous is not None and previous.dot(rotation) < 0:
+                    rotation.negate()   # Keep quaternions on one hemisphere so keys interpolate the short way.
+                locations[bone.name].append(basis.to_translation())
+                rotations[bone.name].append(rotation)
+            else:
+                posed[bone.name] = frame
+
+    action = bpy.data.actions.new(os.path.splitext(os.path.basename(filepath))[0])
+    action.use_fake_user = True     # Keep clips that aren't assigned to the armature.
+    frames = [1.0 + t * fps for t in times]
+    for bone in animated:
+        armature.pose.bones[bone.name].rotation_mode = 'QUATERNION'
+        path = 'pose.bones["' + bone.name + '"].'
+        for i in range(3):
+            set_fcurve_keys(action, path + "location", i, bone.name, frames, [v[i] for v in locations[bone.name]])
+        for i in range(4):
+            set_fcurve_keys(action, path + "rotation_quaternion", i, bone.name, frames, [q[i] for q in rotations[bone.name]])
+    return action
+
+def import_animations(filepaths, armature, mute_constraints=True):
+    """ Imports each Collada clip as its own action on armature.  The first becomes the
+        active action.  The IK rig would override the keyed bones, so its constraints are
+        muted unless mute_constraints is False.  Returns the actions.
+    """
+    scene = bpy.context.scene
+    fps = scene.render.fps / scene.render.fps_base
+    actions = []
+    for filepath in filepaths:
+        start = time.perf_counter()
+        action = import_animation(filepath, armature, fps)
+        print("Imported animation " + action.name + " in {0:.2f}s".format(time.perf_counter() - start))
+        actions.append(action)
+    if actions:
+        armature.animation_data_create()
+        armature.animation_data.action = actions[0]
+        scene.frame_start, scene.frame_end = (int(f) for f in actions[0].frame_range)
+    for pbone in armature.pose.bones:
+        for constraint in pbone.constraints:
+            constraint.mute = mute_constraints
+    return actions
@@ -0,0 +1,115 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# The index of the extracted game tree.  No bpy here, so it can be used outside Blender.
+
+import os
+import posixpath
+import time
+
+asset_indexes = {}  # AssetIndex per game directory, shared by every import this session
+
+def normalize_asset_path(path):
+    # Key used by the asset index: forward slashes, no leading ./ or /, lower case.
+    return posixpath.normpath(path.replace('\\', '/')).lstrip('/').lower()
+
+class AssetIndex:
+    """ Case-insensitive index of the extracted game tree.  Cry files reference each other
+        with Windows-style paths whose case often doesn't match the files on disk, so textures
+        and bindings are resolved here instead of probing the file system for each one.
+    """
+    def __init__(self, basedir):
+        self.basedir = basedir
+        self.paths = {}
+        self.scanned = set()    # Directories rescanned for files missing from the index
+        start = time.perf_counter()
+        for root, dirs, files in os.walk(basedir):
+            for name in files:
+                path = os.path.join(root, name)
+                self.paths.setdefault(normalize_asset_path(os.path.relpath(path, basedir)), path)
+        self.build_time = time.perf_counter() - start
+
+    def resolve(self, path):
+        """ Returns the real path of a file given relative to the game directory (or absolute
+            under it), or None if there is no such file.
+        """
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.basedir)
+        key = normalize_asset_path(path)
+        if key not in self.paths:
+            # Maybe converted or extracted since the index was built.  Rescan its directory.
+            self.scan_dir(posixpath.dirname(key))
+        return self.paths.get(key)
+
+    def add(self, path):
+        # Adds a file written since the index was built (a converted .dae).
+        self.paths[normalize_asset_path(os.path.relpath(path, self.basedir))] = path
+
+    def scan_dir(self, key):
+        """ Adds the files in one directory (given as an index key) to the index, finding
+            it on disk case-insensitively.  Each directory is only rescanned once per index;
+            a new index (Rescan Game Files) starts over.
+        """
+        if key in self.scanned:
+            return
+        self.scanned.add(key)
+        directory = self.basedir
+        for part in key.split('/') if key else []:
+            try:
+                names = {entry.name.lower(): entry.name for entry in os.scandir(directory) if entry.is_dir()}
+            except OSError:
+                return
+            if part not in names:
+                return
+            directory = os.path.join(directory, names[part])
+        try:
+            # Not "with os.scandir()": Blender 2.79's Python 3.5 doesn't have it.
+            for entry in os.scandir(directory):
+                if entry.is_file():
+                    self.paths.setdefault(posixpath.join(key, entry.name.lower()), entry.path)
+        except OSError:
+            return
+
+def get_asset_index(basedir):
+    """ Returns the index of basedir, building it on first use.  It is kept for the rest of
+        the session so every mech imported from the same game tree shares it.
+    """
+    key = os.path.normcase(os.path.abspath(basedir))
+    index = asset_indexes.get(key)
+    if index is None:
+        index = AssetIndex(basedir)
+        asset_indexes[key] = index
+        print("Indexed " + str(len(index.paths)) + " files under " + basedir +
+              " in {0:.2f}s".format(index.build_time))
+    return index
+
+def add_to_asset_index(basedir, paths):
+    # Records new files in basedir's index, if it has been built.
+    index = asset_indexes.get(os.path.normcase(os.path.abspath(basedir)))
+    if index is not None:
+        for path in paths:
+            index.add(path)
+
+def invalidate_asset_index(basedir=None):
+    # Forget the index for basedir (or all of them), e.g. after extracting more files.
+    if basedir is None:
+        asset_indexes.clear()
+    else:
+        asset_indexes.pop(os.path.normcase(os.path.abspath(basedir)), None)
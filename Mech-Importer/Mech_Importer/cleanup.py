@@ -0,0 +1,88 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Removing what an import created but left unused.
+
+import collections
+
+import bpy
+
+IMPORT_DATA = ("objects", "meshes", "materials", "textures", "images")   # bpy.data collections an import adds to
+
+def snapshot_datablocks():
+    # Names of what exists now, so the datablocks an import creates can be told apart later.
+    return {name: set(getattr(bpy.data, name).keys()) for name in IMPORT_DATA}
+
+def get_datablock_size(collection, block):
+    # Rough number of bytes a datablock adds to a saved .blend.
+    if collection == "meshes":
+        return (len(block.vertices) * 16 + len(block.edges) * 12 + len(block.loops) * 8 +
+                len(block.polygons) * 12 + len(block.uv_layers) * len(block.loops) * 8)
+    if collection == "images":
+        return block.packed_file.size if block.packed_file is not None else 0
+    return 1024     # Headers, node trees and the like.  Small, but not free.
+
+def cleanup_import(before, texture_packing='NONE'):
+    """ Removes what an import created but left unused: empties with nothing under them
+        and meshes, materials, textures and images without users.  before is the
+        snapshot_datablocks() taken when the import started; nothing older is touched.
+        texture_packing ('NONE', 'PACK' or 'UNPACK') is applied to the import's remaining
+        images.  Returns {"datablocks": count, "bytes": estimated size} of what was removed.
+    """
+    removed = collections.Counter()
+    reclaimed = 0
+    # Empties left over from the Collada hierarchies.  Removing one can leave its parent
+    # empty too, so repeat.  Bone-parented empties are placeholders and stay.
+    found = True
+    while found:
+        found = False
+        for obj in list(bpy.data.objects):
+            if (obj.name not in before["objects"] and obj.type == 'EMPTY' and not obj.children
+                    and obj.parent_type != 'BONE'):
+                bpy.data.objects.remove(obj, do_unlink=True)
+                removed["objects"] += 1
+                reclaimed += 1024
+                found = True
+    # Removing a material can orphan its images, so repeat here as well.
+    found = True
+    while found:
+        found = False
+        for name in IMPORT_DATA[1:]:
+            collection = getattr(bpy.data, name)
+            for block in list(collection):
+                if block.name not in before[name] and block.users == 0:
+                    reclaimed += get_datablock_size(name, block)
+                    collection.remove(block)
+                    removed[name] += 1
+                    found = True
+
+    for image in bpy.data.images:
+        if image.name in before["images"] or image.source != 'FILE':
+            continue
+        if texture_packing == 'PACK' and image.packed_file is None:
+            image.pack()
+        elif texture_packing == 'UNPACK' and image.packed_file is not None:
+            image.unpack(method='USE_ORIGINAL')
+
+    total = sum(removed.values())
+    print("Cleanup: removed " + str(total) + " datablocks (" +
+          ", ".join(str(count) + " " + name for name, count in sorted(removed.items())) +
+          "), about {0:.2f} MB".format(reclaimed / (1024 * 1024)))
+    return {"datablocks": total, "bytes": reclaimed}
@@ -0,0 +1,69 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+#
+
+# Command line entry point for batch tasks, run from Blender:
+#   blender -b -P Mech_Importer/cli.py -- [--convert] [--build-library <file>] [--catalog <output dir>] [options] <mech.cdf> ...
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Mech_Importer.convert import CONVERTER_COMMAND, convert_sources, find_cdf_sources
+from Mech_Importer.library import build_library
+from Mech_Importer.render import render_catalog
+from Mech_Importer.utils import get_base_dir
+
+def main(argv):
+    """ Runs the batch tasks given on the command line, in the order convert, build the
+        library, render the catalog.
+    """
+    parser = argparse.ArgumentParser(prog="cli.py", description="Batch Mech Importer tasks")
+    parser.add_argument("cdffiles", nargs="+", help=".cdf files of the mechs to process")
+    parser.add_argument("--catalog", metavar="DIR", help="render turnaround images into DIR")
+    parser.add_argument("--convert", action="store_true", help="convert out of date .cga/.cgf files first")
+    parser.add_argument("--converter", default=CONVERTER_COMMAND, help="converter command template")
+    parser.add_argument("--jobs", type=int, default=2, help="number of converters run at once")
+    parser.add_argument("--build-library", metavar="FILE", help="write the parts the mechs share to the library FILE")
+    parser.add_argument("--library", metavar="FILE", default="", help="link shared parts from the library FILE")
+    parser.add_argument("--angles", type=int, default=8, help="number of views around each mech")
+    parser.add_argument("--samples", type=int, default=16, help="Cycles samples per image")
+    parser.add_argument("--resolution", type=int, default=512, help="image width and height in pixels")
+    args = parser.parse_args(argv)
+    if not (args.catalog or args.convert or args.build_library):
+        parser.error("nothing to do: give --catalog, --convert and/or --build-library")
+    if args.convert:
+        # One pool for the whole list, so small mechs don't leave converters idle.
+        sources = {}
+        for cdffile in args.cdffiles:
+            basedir = get_base_dir(cdffile)
+            sources.setdefault(basedir, []).extend(find_cdf_sources(cdffile, basedir))
+        for basedir, files in sources.items():
+            convert_sources(list(dict.fromkeys(files)), basedir, args.converter, args.jobs)
+    if args.build_library:
+        build_library(args.cdffiles, args.build_library)
+    if args.catalog:
+        render_catalog(args.cdffiles, args.catalog, args.angles, args.samples, args.resolution,
+                       args.library or args.build_library or "")
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
@@ -0,0 +1,129 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Converting a mech's .cga/.cgf files to Collada with cgf-converter before importing.
+
+import os
+import shlex
+import subprocess
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None   # No threads available; converters run one at a time.
+
+from .assets import add_to_asset_index, get_asset_index
+
+# {source} is the .cga/.cgf (or .chr) file, {dae} the Collada file it should produce and
+# {basedir} the extracted game directory.  The converter writes the .dae next to the source.
+CONVERTER_COMMAND = 'cgf-converter "{source}" -dae -objectdir "{basedir}"'
+CONVERTER_TIMEOUT = 600     # Seconds before a stuck conversion is killed.
+
+def get_dae_path(source):
+    return os.path.splitext(source)[0] + ".dae"
+
+def find_cdf_sources(cdffile, basedir):
+    """ Returns the source geometry files a .cdf refers to (the skeleton model and every
+        attachment binding, cockpit included) that exist under basedir, without duplicates.
+    """
+    index = get_asset_index(basedir)
+    root = ET.parse(cdffile).getroot()
+    bindings = [model.attrib["File"] for model in root.iter("Model") if "File" in model.attrib]
+    bindings += [geo.attrib["Binding"] for geo in root.iter("Attachment") if geo.attrib.get("Binding")]
+    sources = []
+    for binding in bindings:
+        source = index.resolve(binding)
+        if source is not None and source not in sources:
+            sources.append(source)
+    return sources
+
+def is_up_to_date(source):
+    # The .dae is current if it is at least as new as its source.
+    try:
+        return os.path.getmtime(get_dae_path(source)) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+def run_converter(source, basedir, command=CONVERTER_COMMAND, timeout=CONVERTER_TIMEOUT):
+    """ Runs the converter on one file and returns a record of how it went.  Runs on a worker
+        thread; the converter itself is a separate process.
+    """
+    # Absolute paths, since the converter runs in the source's directory.
+    source = os.path.abspath(source)
+    paths = {"source": source, "dae": get_dae_path(source), "basedir": os.path.abspath(basedir)}
+    if os.name == 'nt':
+        # Leave the parsing to CreateProcess; shlex would eat the backslashes in C:\tools\...
+        args = command.format(**paths)
+    else:
+        args = [arg.format(**paths) for arg in shlex.split(command)]
+    result = {"source": source, "returncode": None, "seconds": 0.0, "error": ""}
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 timeout=timeout, cwd=os.path.dirname(source))
+    except (OSError, subprocess.TimeoutExpired) as e:
+        result["error"] = str(e)
+    else:
+        result["returncode"] = process.returncode
+        if process.returncode != 0:
+            # The last line is usually the one that says what went wrong.
+            output = process.stdout.decode(errors='replace').strip().splitlines()
+            result["error"] = output[-1] if output else "exit code " + str(process.returncode)
+        elif not is_up_to_date(source):
+            result["error"] = "no .dae written"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def convert_sources(sources, basedir, command=CONVERTER_COMMAND, jobs=2, force=False, timeout=CONVERTER_TIMEOUT):
+    """ Converts every source whose .dae is missing or older than it, running at most jobs
+        converters at once.  Returns a summary with a record per converted file.
+    """
+    stale = [source for source in sources if force or not is_up_to_date(source)]
+    start = time.perf_counter()
+    if stale:
+        if ThreadPoolExecutor is not None:
+            with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+                results = list(executor.map(lambda source: run_converter(source, basedir, command, timeout), stale))
+        else:
+            results = [run_converter(source, basedir, command, timeout) for source in stale]
+        # Add the new .dae files to the index, rather than walking the whole tree again.
+        add_to_asset_index(basedir, [get_dae_path(result["source"]) for result in results if not result["error"]])
+    else:
+        results = []
+    failed = [result for result in results if result["error"]]
+    for result in failed:
+        print("Conversion failed: " + result["source"] + ": " + result["error"])
+    summary = {"sources": len(sources),
+               "up_to_date": len(sources) - len(stale),
+               "converted": len(results) - len(failed),
+               "failed": len(failed),
+               "seconds": time.perf_counter() - start,
+               "converter_seconds": sum(result["seconds"] for result in results),
+               "results": results}
+    print("Converted {0} of {1} files ({2} up to date, {3} failed) in {4:.2f}s, {5:.2f}s of converter time".format(
+          summary["converted"], summary["sources"], summary["up_to_date"], summary["failed"],
+          summary["seconds"], summary["converter_seconds"]))
+    return summary
+
+def convert_mech(cdffile, basedir, command=CONVERTER_COMMAND, jobs=2, force=False):
+    # Bring every file the .cdf needs up to date.
+    return convert_sources(find_cdf_sources(cdffile, basedir), basedir, command, jobs, force)
@@ -0,0 +1,346 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Direct glTF binary (.glb) export of an imported mech.
+
+import array
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+
+import bpy
+import mathutils
+
+from .utils import get_mech_name, is_helper_object
+
+GLB_MAGIC = 0x46546C67          # "glTF"
+GLB_CHUNK_JSON = 0x4E4F534A     # "JSON"
+GLB_CHUNK_BIN = 0x004E4942      # "BIN\0"
+GLTF_FLOAT = 5126
+GLTF_UNSIGNED_SHORT = 5123
+GLTF_UNSIGNED_INT = 5125
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+GLTF_Z_UP = [-0.7071068, 0.0, 0.0, 0.7071068]   # Root rotation taking Blender's Z up to glTF's Y up
+
+def get_mesh_primitives(mesh):
+    """ Splits a mesh into one triangle list per material index, with a vertex for each
+        distinct position/normal/UV combination.  Returns {material_index: (positions,
+        normals, uvs, indices)} as arrays; uvs is empty if the mesh has no UV layer.
+    """
+    nverts, nloops, npolys = len(mesh.vertices), len(mesh.loops), len(mesh.polygons)
+    co = array.array('f', [0]) * (nverts * 3)
+    vertex_normals = array.array('f', [0]) * (nverts * 3)
+    loop_vertex = array.array('i', [0]) * nloops
+    loop_start = array.array('i', [0]) * npolys
+    loop_total = array.array('i', [0]) * npolys
+    material_index = array.array('i', [0]) * npolys
+    use_smooth = array.array('b', [0]) * npolys
+    poly_normals = array.array('f', [0]) * (npolys * 3)
+    mesh.vertices.foreach_get("co", co)
+    mesh.vertices.foreach_get("normal", vertex_normals)
+    mesh.loops.foreach_get("vertex_index", loop_vertex)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    mesh.polygons.foreach_get("material_index", material_index)
+    mesh.polygons.foreach_get("use_smooth", use_smooth)
+    mesh.polygons.foreach_get("normal", poly_normals)
+    uv = None
+    if mesh.uv_layers.active is not None:
+        uv = array.array('f', [0]) * (nloops * 2)
+        mesh.uv_layers.active.data.foreach_get("uv", uv)
+
+    primitives = {}
+    for p in range(npolys):
+        prim = primitives.get(material_index[p])
+        if prim is None:
+            prim = primitives[material_index[p]] = ({}, array.array('f'), array.array('f'),
+                                                    array.array('f'), array.array('I'))
+        keys, positions, normals, uvs, indices = prim
+        corners = []
+        for l in range(loop_start[p], loop_start[p] + loop_total[p]):
+            v = loop_vertex[l]
+            if use_smooth[p]:
+                normal = tuple(vertex_normals[v * 3:v * 3 + 3])
+            else:
+                normal = tuple(poly_normals[p * 3:p * 3 + 3])
+            # glTF puts the UV origin at the top left.
+            texcoord = (uv[l * 2], 1.0 - uv[l * 2 + 1]) if uv is not None else (0.0, 0.0)
+            key = (v, normal, texcoord)
+            index = keys.get(key)
+            if index is None:
+                index = keys[key] = len(keys)
+                positions.extend(co[v * 3:v * 3 + 3])
+                normals.extend(normal)
+                if uv is not None:
+                    uvs.extend(texcoord)
+            corners.append(index)
+        for i in range(1, len(corners) - 1):
+            indices.extend((corners[0], corners[i], corners[i + 1]))
+    return {mi: prim[1:] for mi, prim in primitives.items()}
+
+def get_node_transform(matrix):
+    # glTF node TRS from a 4x4 matrix, leaving out identity parts.
+    location, rotation, scale = matrix.decompose()
+    node = {}
+    if location.length > 1e-6:
+        node["translation"] = list(location)
+    if abs(rotation.w) < 1.0 - 1e-6:
+        node["rotation"] = [rotation.x, rotation.y, rotation.z, rotation.w]
+    if any(abs(s - 1.0) > 1e-6 for s in scale):
+        node["scale"] = list(scale)
+    return node
+
+def find_shader_image(node_tree, shader, input_name):
+    # Image plugged into a shader input, directly or through a normal map node.
+    socket = shader.inputs[input_name]
+    while socket.is_linked:
+        node = socket.links[0].from_node
+        if node.type == 'TEX_IMAGE':
+            return node.image
+        if node.type != 'NORMAL_MAP':
+            return None
+        socket = node.inputs["Color"]
+    return None
+
+class GLBWriter:
+    """ Builds a glTF 2.0 document with a single binary buffer.  Geometry, materials and
+        textures are cached as they are added, so repeated parts share one accessor set
+        and every image is stored once.
+    """
+    def __init__(self):
+        self.gltf = {"asset": {"version": "2.0", "generator": "Mech Importer"},
+                     "scene": 0, "scenes": [{"nodes": []}], "nodes": [], "meshes": [],
+                     "materials": [], "textures": [], "images": [], "samplers": [{}],
+                     "accessors": [], "bufferViews": [], "buffers": []}
+        self.blob = bytearray()
+        self._geometry = {}     # geometry hash -> primitive accessor sets
+        self._meshes = {}       # (geometry hash, material indices) -> mesh index
+        self._materials = {}    # material name -> material index
+        self._textures = {}     # image path -> texture index
+        self._tempdir = None
+        self._png_scene = None  # Scene whose output settings save_render uses for the PNGs
+
+    def add_buffer_view(self, data, target=None):
+        self.blob.extend(bytes(-len(self.blob) % 4))
+        view = {"buffer": 0, "byteOffset": len(self.blob), "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        self.blob.extend(data)
+        self.gltf["bufferViews"].append(view)
+        return len(self.gltf["bufferViews"]) - 1
+
+    def add_accessor(self, data, component_type, element_type, size, target, bounds=False):
+        accessor = {"bufferView": self.add_buffer_view(data.tobytes(), target),
+                    "componentType": component_type, "count": len(data) // size, "type": element_type}
+        if bounds:
+            accessor["min"] = [min(data[i::size]) for i in range(size)]
+            accessor["max"] = [max(data[i::size]) for i in range(size)]
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def add_geometry(self, mesh):
+        primitives = get_mesh_primitives(mesh)
+        digest = hashlib.sha1()
+        for mi in sorted(primitives):
+            for data in primitives[mi]:
+                digest.update(data.tobytes())
+        key = digest.hexdigest()
+        if key not in self._geometry:
+            accessors = {}
+            for mi, (positions, normals, uvs, indices) in primitives.items():
+                if not indices:
+                    continue
+                if max(indices) < 65536:
+                    indices, index_type = array.array('H', indices), GLTF_UNSIGNED_SHORT
+                else:
+                    index_type = GLTF_UNSIGNED_INT
+                attributes = {"POSITION": self.add_accessor(positions, GLTF_FLOAT, "VEC3", 3, GLTF_ARRAY_BUFFER, True),
+                              "NORMAL": self.add_accessor(normals, GLTF_FLOAT, "VEC3", 3, GLTF_ARRAY_BUFFER)}
+                if uvs:
+                    attributes["TEXCOORD_0"] = self.add_accessor(uvs, GLTF_FLOAT, "VEC2", 2, GLTF_ARRAY_BUFFER)
+                accessors[mi] = (attributes, self.add_accessor(indices, index_type, "SCALAR", 1, GLTF_ELEMENT_ARRAY_BUFFER))
+            self._geometry[key] = accessors
+        return key
+
+    def add_texture(self, image):
+        path = bpy.path.abspath(image.filepath) if image.filepath else image.name
+        if path not in self._textures:
+            # DDS isn't a glTF image format.  Save a PNG copy and embed that.
+            if self._tempdir is None:
+                self._tempdir = tempfile.mkdtemp(prefix="mech_glb_")
+            pngfile = os.path.join(self._tempdir, str(len(self._textures)) + ".png")
+            # save_render writes the loaded pixels in the scene's output format, without
+            # handing them to Python.  A Non-Color image is written as is.
+            scene = self.get_png_scene()
+            scene.view_settings.view_transform = 'Raw' if image.colorspace_settings.name == 'Non-Color' else 'Default'
+            image.save_render(pngfile, scene)
+            with open(pngfile, 'rb') as f:
+                view = self.add_buffer_view(f.read())
+            self.gltf["images"].append({"bufferView": view, "mimeType": "image/png", "name": image.name})
+            self.gltf["textures"].append({"source": len(self.gltf["images"]) - 1, "sampler": 0})
+            self._textures[path] = len(self.gltf["textures"]) - 1
+        return self._textures[path]
+
+    def add_material(self, material):
+        if material.name in self._materials:
+            return self._materials[material.name]
+        entry = {"name": material.name, "pbrMetallicRoughness": {"metallicFactor": 0.0}}
+        if material.use_nodes:
+            shader = next((n for n in material.node_tree.nodes if n.type == 'BSDF_PRINCIPLED'), None)
+            if shader is not None:
+                pbr = entry["pbrMetallicRoughness"]
+                pbr["metallicFactor"] = shader.inputs["Metallic"].default_value
+                pbr["roughnessFactor"] = shader.inputs["Roughness"].default_value
+                diffuse = find_shader_image(material.node_tree, shader, "Base Color")
+                if diffuse is not None:
+                    pbr["baseColorTexture"] = {"index": self.add_texture(diffuse)}
+                else:
+                    pbr["baseColorFactor"] = list(shader.inputs["Base Color"].default_value)
+                normal = find_shader_image(material.node_tree, shader, "Normal")
+                if normal is not None:
+                    entry["normalTexture"] = {"index": self.add_texture(normal)}
+        self.gltf["materials"].append(entry)
+        self._materials[material.name] = len(self.gltf["materials"]) - 1
+        return self._materials[material.name]
+
+    def add_mesh(self, obj):
+        key = self.add_geometry(obj.data)
+        slots = tuple(self.add_material(slot.material) if slot.material is not None else -1
+                      for slot in obj.material_slots)
+        if (key, slots) not in self._meshes:
+            primitives = []
+            for mi, (attributes, indices) in sorted(self._geometry[key].items()):
+                primitive = {"attributes": attributes, "indices": indices}
+                if mi < len(slots) and slots[mi] >= 0:
+                    primitive["material"] = slots[mi]
+                primitives.append(primitive)
+            self.gltf["meshes"].append({"name": obj.data.name, "primitives": primitives})
+            self._meshes[(key, slots)] = len(self.gltf["meshes"]) - 1
+        return self._meshes[(key, slots)]
+
+    def add_node(self, name, matrix, parent=None):
+        node = get_node_transform(matrix)
+        node["name"] = name
+        self.gltf["nodes"].append(node)
+        index = len(self.gltf["nodes"]) - 1
+        if parent is None:
+            self.gltf["scenes"][0]["nodes"].append(index)
+        else:
+            self.gltf["nodes"][parent].setdefault("children", []).append(index)
+        return index
+
+    def get_png_scene(self):
+        if self._png_scene is None:
+            self._png_scene = bpy.data.scenes.new("mech_glb_png")
+            settings = self._png_scene.render.image_settings
+            settings.file_format = 'PNG'
+            settings.color_mode = 'RGBA'
+            settings.compression = 15
+            self._png_scene.view_settings.look = 'None'
+            self._png_scene.view_settings.exposure = 0.0
+            self._png_scene.view_settings.gamma = 1.0
+        return self._png_scene
+
+    def close(self):
+        # Remove the PNG copies and the scene made by add_texture.
+        if self._tempdir is not None:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+            self._tempdir = None
+        if self._png_scene is not None:
+            bpy.data.scenes.remove(self._png_scene, do_unlink=True)
+            self._png_scene = None
+
+    def write(self, filepath):
+        self.blob.extend(bytes(-len(self.blob) % 4))
+        self.gltf["buffers"] = [{"byteLength": len(self.blob)}]
+        # glTF doesn't allow empty top-level arrays.
+        gltf = {key: value for key, value in self.gltf.items() if value != []}
+        if "textures" not in gltf:
+            gltf.pop("samplers", None)
+        document = json.dumps(gltf, separators=(',', ':')).encode("utf-8")
+        document += b' ' * (-len(document) % 4)
+        length = 12 + 8 + len(document) + 8 + len(self.blob)
+        with open(filepath, 'wb') as f:
+            f.write(struct.pack("<III", GLB_MAGIC, 2, length))
+            f.write(struct.pack("<II", len(document), GLB_CHUNK_JSON))
+            f.write(document)
+            f.write(struct.pack("<II", len(self.blob), GLB_CHUNK_BIN))
+            f.write(self.blob)
+        return length
+
+def write_mech_glb(writer, armature, filepath):
+    # Adds the mech's bones and parts to writer and writes the file.  Returns its size.
+    root = writer.add_node(get_mech_name(armature), mathutils.Matrix.Identity(4))
+    writer.gltf["nodes"][root]["rotation"] = GLTF_Z_UP
+    rig = writer.add_node(armature.name, armature.matrix_world, root)
+    bone_nodes = {}
+    bone_worlds = {}
+
+    def add_bone(pbone, parent):
+        if pbone.parent is None:
+            matrix = pbone.matrix
+        else:
+            matrix = pbone.parent.matrix.inverted() * pbone.matrix
+        bone_nodes[pbone.name] = writer.add_node(pbone.name, matrix, parent)
+        bone_worlds[pbone.name] = armature.matrix_world * pbone.matrix
+        for child in pbone.children:
+            add_bone(child, bone_nodes[pbone.name])
+
+    for pbone in armature.pose.bones:
+        if pbone.parent is None:
+            add_bone(pbone, rig)
+
+    def add_object(obj, parent, parent_world):
+        if obj.type not in ('MESH', 'EMPTY') or is_helper_object(obj.name) or obj.hide_render:
+            return
+        node = writer.add_node(obj.name, parent_world.inverted() * obj.matrix_world, parent)
+        if obj.type == 'MESH':
+            writer.gltf["nodes"][node]["mesh"] = writer.add_mesh(obj)
+        for child in obj.children:
+            add_object(child, node, obj.matrix_world)
+
+    for obj in armature.children:
+        if obj.parent_type == 'BONE' and obj.parent_bone in bone_nodes:
+            add_object(obj, bone_nodes[obj.parent_bone], bone_worlds[obj.parent_bone])
+        else:
+            add_object(obj, rig, armature.matrix_world)
+    return writer.write(filepath)
+
+def export_mech_glb(armature, filepath):
+    """ Writes the mech rigged to armature as a single .glb.  Bones become nodes and the
+        bone-parented parts stay rigid children of them, in the current pose.  Returns a
+        dict with the output size in bytes and the export time in seconds.
+    """
+    start = time.perf_counter()
+    writer = GLBWriter()
+    try:
+        size = write_mech_glb(writer, armature, filepath)
+    finally:
+        writer.close()
+    stats = {"bytes": size, "seconds": time.perf_counter() - start,
+             "meshes": len(writer.gltf["meshes"]), "textures": len(writer.gltf["textures"])}
+    print("Exported " + filepath + ": {0:.2f} MB in {1:.2f}s ({2} meshes, {3} textures)".format(
+        size / (1024 * 1024), stats["seconds"], stats["meshes"], stats["textures"]))
+    return stats
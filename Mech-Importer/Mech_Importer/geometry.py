@@ -0,0 +1,274 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Importing a mech's attachments, and the on-demand cockpit.
+
+import os
+import xml.etree.ElementTree as ET
+
+import bpy
+
+from .assets import get_asset_index
+from .loadout import get_attachment_key
+from .materials import create_materials
+from .meshcache import MeshSidecar, create_mesh_from_sidecar, link_object_records, read_mesh_sidecar, write_mesh_sidecar
+from .utils import (convert_to_location, convert_to_rotation, find_mech_armature, get_descendants,
+                    get_transform_matrix, weapons)
+
+def import_collada_part(daefile, use_cache=True, sidecar=None):
+    """ Imports one converted part, from its sidecar when that is current.  Otherwise runs the
+        Collada importer and writes the sidecar for next time.  Returns the new objects.
+        sidecar may be one already opened (by the prefetcher); it is closed either way.
+    """
+    if use_cache:
+        if sidecar is None:
+            sidecar = read_mesh_sidecar(daefile)
+        if sidecar is not None:
+            meshes = {}
+            try:
+                for i, record in enumerate(sidecar.records):
+                    if record["type"] == 'MESH':
+                        meshes[i] = create_mesh_from_sidecar(sidecar, record)
+                return link_object_records(sidecar.records, meshes)
+            except Exception as e:
+                # Passed the header check but is damaged.  Import the .dae instead, which
+                # also rewrites the sidecar.
+                print("    Unable to use mesh cache for " + daefile + ": " + str(e))
+                for mesh in meshes.values():
+                    bpy.data.meshes.remove(mesh, do_unlink=True)
+            finally:
+                sidecar.close()
+    bpy.ops.wm.collada_import(filepath=daefile, find_chains=True, auto_connect=True)
+    objects = bpy.context.selected_objects[:]
+    if use_cache:
+        try:
+            write_mesh_sidecar(daefile, objects)
+        except OSError as e:
+            # Read-only game tree and the like.  The import itself is fine.
+            print("    Unable to write mesh cache for " + daefile + ": " + str(e))
+    return objects
+
+def get_binding_path(basedir, geo):
+    # Attachment bindings point at the .cga/.cgf; the converted file sits next to it as .dae.
+    # Returns None if it hasn't been converted.
+    return get_asset_index(basedir).resolve(os.path.splitext(geo.attrib["Binding"])[0] + ".dae")
+
+def get_geometry_files(cdffile, basedir):
+    # Converted part files a .cdf file will import, in attachment order.
+    bindings = [get_binding_path(basedir, geo) for geo in ET.parse(cdffile).iter("Attachment")
+                if not geo.attrib["AName"] == "cockpit"]
+    return [binding for binding in bindings if binding is not None]
+
+def create_cockpit_placeholder(armature, geo, basedir, mechname, matfile):
+    """ Creates an empty on the cockpit's bone in place of the cockpit itself.  It records
+        where the cockpit geometry and materials are, so load_cockpit() can bring them in later.
+    """
+    bonename = geo.attrib["BoneName"].replace(' ', '_')
+    placeholder = bpy.data.objects.new(mechname + "_cockpit", None)
+    bpy.context.scene.objects.link(placeholder)
+    placeholder.empty_draw_type = 'CUBE'
+    placeholder.empty_draw_size = 0.25
+    placeholder.rotation_mode = 'QUATERNION'
+    placeholder.parent = armature
+    placeholder.parent_bone = bonename
+    placeholder.parent_type = 'BONE'
+    placeholder.matrix_world = get_transform_matrix(convert_to_rotation(geo.attrib["Rotation"]),
+                                                    convert_to_location(geo.attrib["Position"]))
+    binding = get_binding_path(basedir, geo)
+    placeholder["mech_cockpit_binding"] = binding if binding is not None else ""
+    placeholder["mech_cockpit_matfile"] = matfile
+    placeholder["mech_cockpit_basedir"] = basedir
+    return placeholder
+
+def find_cockpit_placeholder(context):
+    # The active cockpit placeholder, or the one on the active mech.
+    obj = context.active_object
+    if obj is not None and "mech_cockpit_binding" in obj:
+        return obj
+    armature = find_mech_armature(context)
+    if armature is None:
+        return None
+    return next((child for child in armature.children if "mech_cockpit_binding" in child), None)
+
+def load_cockpit(placeholder, use_mesh_cache=True):
+    """ Imports the cockpit geometry and its materials under a cockpit placeholder.
+        Returns the new objects (none if it is already loaded or can't be found).
+    """
+    if placeholder.children or not placeholder["mech_cockpit_binding"]:
+        return []
+    basedir = placeholder["mech_cockpit_basedir"]
+    matfile = placeholder["mech_cockpit_matfile"]
+    cockpit_materials = create_materials(matfile, basedir) if os.path.isfile(matfile) else {}
+    placeholder["mech_cockpit_materials"] = [mat.name for mat in cockpit_materials.values()]
+    objects = import_collada_part(placeholder["mech_cockpit_binding"], use_mesh_cache)
+    replaced = set()
+    for obj in objects:
+        if obj.parent is None:
+            obj.parent = placeholder
+        if obj.type != 'MESH':
+            continue
+        for slot in obj.material_slots:
+            if slot.material is None:
+                continue
+            # Collada materials are named after the .mtl ones, give or take a prefix or .001 suffix.
+            name = slot.material.name.rsplit('.', 1)[0] if '.' in slot.material.name else slot.material.name
+            match = cockpit_materials.get(name) or next(
+                (mat for key, mat in cockpit_materials.items() if key in name), None)
+            if match is not None:
+                replaced.add(slot.material)
+                slot.material = match
+    for mat in replaced:
+        if mat.users == 0:
+            bpy.data.materials.remove(mat)
+    print("Loaded cockpit " + placeholder.name + ": " + str(len(objects)) + " objects, " +
+          str(len(cockpit_materials)) + " materials")
+    return objects
+
+def unload_cockpit(placeholder):
+    """ Removes everything load_cockpit() added, leaving just the placeholder. """
+    objects = get_descendants(placeholder)
+    meshes = set(obj.data for obj in objects if obj.type == 'MESH')
+    for obj in objects:
+        bpy.data.objects.remove(obj, do_unlink=True)
+    materials = set(mat for mesh in meshes for mat in mesh.materials if mat is not None)
+    for mesh in meshes:
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+    for name in placeholder.get("mech_cockpit_materials", []):
+        if name in bpy.data.materials:
+            materials.add(bpy.data.materials[name])
+    images = set()
+    for mat in materials:
+        if mat.users == 0:
+            if mat.node_tree is not None:
+                images.update(node.image for node in mat.node_tree.nodes
+                              if node.type == 'TEX_IMAGE' and node.image is not None)
+            bpy.data.materials.remove(mat)
+    for image in images:
+        if image.users == 0:
+            bpy.data.images.remove(image)
+    if "mech_cockpit_materials" in placeholder:
+        del placeholder["mech_cockpit_materials"]
+    print("Unloaded cockpit " + placeholder.name)
+
+def set_part_material(obj, material):
+    # Parts linked from the library have read-only meshes, so their material is set on the object.
+    if obj.data.library is not None:
+        obj.material_slots[0].link = 'OBJECT'
+        obj.material_slots[0].material = material
+    elif len(obj.material_slots) == 0:
+        obj.data.materials.append(material)
+    else:
+        obj.data.materials[0] = material
+
+def import_geometry(cdffile, basedir, bodydir, mechname, use_mesh_cache=True, prefetcher=None, cockpit_matfile="",
+                    library=None, attachments=None):
+    """ Imports the attachments of a .cdf onto the armature, or only those whose keys are in
+        attachments (see get_attachment_key).  Returns the objects created, including the
+        cockpit placeholder.
+    """
+    armature = bpy.data.objects['Armature']
+    print("Importing mech geometry...")
+    imported = []
+    geometry = ET.parse(cdffile)
+    for geo in geometry.iter("Attachment"):
+        if attachments is not None and get_attachment_key(geo) not in attachments:
+            continue
+        if not geo.attrib["AName"] == "cockpit":
+            print("Importing " + geo.attrib["AName"])
+            # Get all the attribs
+            aname    = geo.attrib["AName"]
+            rotation = convert_to_rotation(geo.attrib["Rotation"])
+            location = convert_to_location(geo.attrib["Position"])
+            bonename = geo.attrib["BoneName"].replace(' ','_')
+            binding  = get_binding_path(basedir, geo)
+            if binding is None:
+                # Not converted, or not extracted (like Urbie lights, under purchasables).
+                print("    Unable to find " + geo.attrib["Binding"])
+                continue
+            flags    = geo.attrib["Flags"]
+            # Materials depend on the part type.  For most, <mech>_body.  Weapons is <mech>_variant.  Window/cockpit is 
+            # <mech>_window.  Also need to figure out how to deal with _generic materials after the import.
+            materialname = mechname + "_body"
+            if any(weapon in aname for weapon in weapons):
+                materialname = mechname + "_variant"
+            if "_damaged" in aname or "_prop" in aname:
+                materialname = mechname + "_body"
+            if "head_cockpit" in aname:
+                materialname = mechname + "_window"
+            # We now have all the geometry parts that need to be imported, their loc/rot, and material.  Import.
+            obj_objects = library.create_part(binding) if library is not None else None
+            if obj_objects is None:
+                prefetched = prefetcher.take(binding) if prefetcher is not None else None
+                sidecar = prefetched if isinstance(prefetched, MeshSidecar) else None
+                try:
+                    obj_objects = import_collada_part(binding, use_mesh_cache, sidecar)
+                except:
+                    # Unable to open the file.  Probably not found (like Urbie lights, under purchasables).
+                    continue
+            imported.extend(obj_objects)
+            i = 0
+            for obj in obj_objects:
+                if not obj.type == 'EMPTY':
+                    armature.select = True
+                    bpy.context.scene.objects.active = armature
+                    bone_location = bpy.context.object.pose.bones[bonename].head
+                    bone_rotation = obj.rotation_quaternion
+                    #print("    Original loc and rot: " + str(bone_location) + " and " + str(bone_rotation))
+                    #print("    Materials for " + obj.name)
+                    bpy.context.scene.objects.active = obj
+                    print("    Name: " + obj.name)
+                    # If this is a parent node, rotate/translate it. Otherwise skip it.
+                    if i == 0:
+                        matrix = get_transform_matrix(rotation, location)       # Converts the location vector and rotation quat into a 4x4 matrix.
+                        #parent this first object to the appropriate bone
+                        obj.rotation_mode = 'QUATERNION'
+                        bone = armature.data.bones[bonename]
+                        obj.parent = armature
+                        obj.parent_bone = bonename
+                        obj.parent_type = 'BONE'
+                        obj.matrix_world = matrix
+                        i = i + 1
+                    # Vertex groups.  The weights live in the mesh, so not for linked library parts.
+                    if obj.data.library is None:
+                        vg = obj.vertex_groups.new(bonename)
+                        nverts = len(obj.data.vertices)
+                        for i in range(nverts):
+                            vg.add([i], 1.0, 'REPLACE')
+                    if len(obj.material_slots) == 0 or (obj.data.library is not None and obj.material_slots[0].material is None):
+                        # no materials
+                        set_part_material(obj, bpy.data.materials[materialname])               # If there is no material, add a dummy mat.
+                    else:
+                        # Material corrections.  If material slot 0 contains "generic", it's a generic material, unless the key doesn't exist.  Otherwise stays variant.
+                        if "generic" in obj.material_slots[0].name:
+                            if  mechname + "_generic" in bpy.data.materials.keys():
+                                materialname = mechname + "_generic"
+                            else:
+                                materialname = "generic"            # For some reason it's just generic, not <mech>_generic
+                        else:
+                            materialname = mechname + "_variant"
+                        if "_prop" in obj.name:
+                            materialname = mechname + "_body"
+                        set_part_material(obj, bpy.data.materials[materialname])
+                    obj.select = False
+        else:
+            # Only a placeholder.  The cockpit itself is loaded on demand by load_cockpit().
+            imported.append(create_cockpit_placeholder(armature, geo, basedir, mechname, cockpit_matfile))
+    return imported
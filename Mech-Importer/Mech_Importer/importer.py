@@ -0,0 +1,150 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# import_mech, which puts all the pieces together.
+
+import collections
+import os
+
+import bpy
+
+from .assets import get_asset_index, invalidate_asset_index
+from .cleanup import cleanup_import, snapshot_datablocks
+from .convert import convert_sources, find_cdf_sources
+from .geometry import get_geometry_files, import_geometry
+from .library import open_library
+from .loadout import create_loadout_group, get_loadout_attachments, show_loadout
+from .materials import create_materials, get_material_textures
+from .prefetch import AttachmentPrefetcher
+from .rig import create_IKs, create_proxy_rig, import_armature
+from .utils import get_base_dir, get_body_dir, get_mech, is_helper_object, weapons
+from .viewport import apply_viewport_profile, set_viewport_shading
+
+def set_layers():
+    # Set the layers that objects are on.
+    empties = [obj for obj in bpy.data.objects if is_helper_object(obj.name)]
+    for empty in empties:
+        empty.layers[4] = True
+        empty.layers[0] = False
+    # Set weapons and special geometry to layer 2
+    names = bpy.data.objects.keys()
+    for name in names:
+        if any(x in name for x in weapons):
+            bpy.data.objects[name].layers[1] = True
+            bpy.data.objects[name].layers[0] = False
+
+def import_mech(context, filepath, *, use_dds=True, use_tif=False, use_mesh_cache=True,
+                prefetch_lookahead=4, prefetch_memory=256, rescan_assets=False, cleanup=False,
+                texture_packing='NONE', viewport_profile='FULL', rig_type='FULL', converter_command="",
+                converter_jobs=2, library="", loadouts=(), relpath=None):
+    """ Imports the mech in the .cdf file at filepath.  loadouts are other .cdf files of the
+        same chassis to import onto the same armature, each shown or hidden as a group.
+    """
+    print("Import Mech")
+    print(filepath)
+    cdffile = filepath      # The input file
+    cdffiles = [cdffile] + [f for f in loadouts if f != cdffile]
+    # Split up filepath into the variables we want.
+    basedir = get_base_dir(filepath)
+    bodydir = get_body_dir(filepath)
+    mechdir = os.path.dirname(filepath)
+    mech = get_mech(filepath)
+    if rescan_assets:
+        invalidate_asset_index(basedir)
+    if converter_command:
+        # Convert anything that is missing or out of date first.  Failures are reported and
+        # the import carries on; unconverted parts are skipped as usual.
+        sources = [source for f in cdffiles for source in find_cdf_sources(f, basedir)]
+        convert_sources(list(dict.fromkeys(sources)), basedir, converter_command, converter_jobs)
+    index = get_asset_index(basedir)
+    matfile = os.path.join(bodydir, mech + "_body.mtl")
+    matfile = index.resolve(matfile) or matfile
+    cockpit_matfile = os.path.join(mechdir, "cockpit_standard", mech + 
+                                   "_a_cockpit_standard.mtl")
+    cockpit_matfile = index.resolve(cockpit_matfile) or cockpit_matfile
+    armature_file = os.path.join(bodydir, mech + ".dae")
+    armature_file = index.resolve(armature_file) or armature_file
+    before = snapshot_datablocks()
+
+    bpy.context.scene.render.engine = 'CYCLES'      # Set to cycles mode
+    
+    # Set material mode. # iterate through areas in current screen
+    set_viewport_shading()
+    
+    # Start reading textures and parts in the background while the armature imports.
+    # Parts in the shared library are linked from it rather than imported.
+    shared = open_library(library, cdffiles, basedir) if library else None
+    # OrderedDict keeps the prefetch in CDF order; plain dicts don't on Python 3.5.
+    geometry_files = collections.OrderedDict.fromkeys(f for cdf in cdffiles for f in get_geometry_files(cdf, basedir))
+    prefetch_files = get_material_textures(matfile, basedir) + [
+        f for f in geometry_files if shared is None or not shared.has_part(f)]
+    prefetcher = AttachmentPrefetcher(prefetch_files, prefetch_lookahead, prefetch_memory * 1024 * 1024,
+                                      use_mesh_cache=use_mesh_cache)
+    try:
+        # Try to import the armature.  If we can't find it, then return error.
+        result = import_armature(armature_file)   # import the armature.
+        if result == False:    
+            print("Error importing armature at: " + 
+                  armature_file)
+            return False
+        bpy.data.objects['Armature']["mech"] = mech
+        if shared is not None:
+            bpy.data.objects['Armature']["mech_library"] = library
+
+        # Create the materials.
+        materials = create_materials(matfile, basedir, prefetcher)
+        # Import the geometry and assign materials.  The cockpit's materials are only
+        # created if it is loaded (see load_cockpit).
+        if len(cdffiles) == 1:
+            import_geometry(cdffile, basedir, bodydir, mech, use_mesh_cache, prefetcher, cockpit_matfile, shared)
+        else:
+            # Parts every loadout has are imported once; the rest go in a group per loadout.
+            common, specific = get_loadout_attachments(cdffiles)
+            import_geometry(cdffile, basedir, bodydir, mech, use_mesh_cache, prefetcher, cockpit_matfile, shared,
+                            common)
+            for loadout in cdffiles:
+                parts = import_geometry(loadout, basedir, bodydir, mech, use_mesh_cache, prefetcher,
+                                        cockpit_matfile, shared, specific[loadout])
+                create_loadout_group(bpy.data.objects['Armature'], loadout, parts)
+            print("Loadouts: {0} shared parts, {1}".format(len(common), ", ".join(
+                  get_mech(loadout) + " " + str(len(specific[loadout])) for loadout in cdffiles)))
+    finally:
+        prefetcher.close()
+    print(prefetcher.report())
+
+    # Set the layers for existing objects
+    set_layers()
+
+    # Advanced Rigging stuff.  Make bone shapes, IKs, etc.
+    if rig_type == 'PROXY':
+        create_proxy_rig(bpy.data.objects['Armature'])
+    else:
+        bpy.ops.object.mode_set(mode='EDIT')
+        create_IKs()
+    if viewport_profile != 'FULL':
+        # FULL is how the import leaves things anyway.
+        apply_viewport_profile(bpy.data.objects['Armature'], viewport_profile)
+
+    if len(cdffiles) > 1:
+        show_loadout(bpy.data.objects['Armature'], get_mech(cdffile))
+
+    if cleanup:
+        cleanup_import(before, texture_packing)
+    return {'FINISHED'}
@@ -0,0 +1,178 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# The shared part library: weapons and generic parts used by many mechs, stored once in a
+# library .blend that each mech links to instead of embedding its own copy.
+
+import collections
+import hashlib
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+
+import bpy
+
+from .geometry import get_binding_path, import_collada_part
+from .meshcache import get_object_records, get_source_stamp, link_object_records
+from .assets import normalize_asset_path
+from .utils import get_base_dir, get_mech
+
+LIBRARY_VERSION = 2     # 2: object records carry the parent inverse
+
+def get_manifest_path(filepath):
+    # The manifest sits next to the library: mwo_shared.blend -> mwo_shared.json
+    return os.path.splitext(filepath)[0] + ".json"
+
+def get_shared_bindings(cdffile, basedir):
+    """ Converted parts a .cdf takes from outside its own mech directory (weapons, generic
+        parts).  Returns an ordered {library key: .dae path}; the key is the .dae's path in
+        the game tree, so it is the same for every mech that uses the part.
+    """
+    mechdir = normalize_asset_path(os.path.relpath(os.path.dirname(cdffile), basedir))
+    shared = collections.OrderedDict()
+    for geo in ET.parse(cdffile).iter("Attachment"):
+        if geo.attrib["AName"] == "cockpit":
+            continue
+        daefile = get_binding_path(basedir, geo)
+        if daefile is None:
+            continue
+        key = normalize_asset_path(os.path.relpath(daefile, basedir))
+        if not key.startswith(mechdir + "/"):
+            shared[key] = daefile
+    return shared
+
+def build_library(cdffiles, filepath, use_mesh_cache=True):
+    """ Imports every shared part used by the given mechs once, writes their meshes to the
+        library .blend at filepath and the manifest next to it, then removes them from this
+        file again.  Returns the manifest.
+    """
+    start = time.perf_counter()
+    items = collections.OrderedDict()
+    mechs = collections.OrderedDict()
+    for cdffile in cdffiles:
+        basedir = get_base_dir(cdffile)
+        shared = get_shared_bindings(cdffile, basedir)
+        mechs[get_mech(cdffile)] = list(shared)
+        for key, daefile in shared.items():
+            item = items.setdefault(key, {"dae": daefile, "mechs": []})
+            item["mechs"].append(get_mech(cdffile))
+
+    meshes = set()
+    objects = []
+    for key, item in list(items.items()):
+        daefile = item.pop("dae")
+        try:
+            part = import_collada_part(daefile, use_mesh_cache)
+        except Exception as e:
+            print("Library: unable to import " + daefile + ": " + str(e))
+            part = None
+        if not part or any(obj.type not in ('MESH', 'EMPTY') for obj in part):
+            # Left for the mechs to import themselves.
+            del items[key]
+            objects.extend(part or [])
+            continue
+        objects.extend(part)
+        digest = hashlib.md5(key.encode("utf-8")).hexdigest()[:8]
+        for obj in part:
+            if obj.type == 'MESH':
+                # Unique names, since different parts often use the same object names.
+                obj.data.name = digest + "_" + obj.name[:50]
+                if len(obj.data.materials) == 0:
+                    # Linked meshes can't gain slots, and each mech sets its own material.
+                    obj.data.materials.append(None)
+                meshes.add(obj.data)
+        item["records"] = get_object_records(part)
+        item["stamp"] = list(get_source_stamp(daefile))
+    for mech in mechs:
+        mechs[mech] = [key for key in mechs[mech] if key in items]
+
+    bpy.data.libraries.write(filepath, meshes, fake_user=True)
+    manifest = {"version": LIBRARY_VERSION,
+                "library": os.path.basename(filepath),
+                "items": items,
+                "mechs": mechs}
+    with open(get_manifest_path(filepath), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    # The parts only needed to exist long enough to be written.
+    for obj in objects:
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for mesh in meshes:
+        bpy.data.meshes.remove(mesh, do_unlink=True)
+
+    uses = sum(len(keys) for keys in mechs.values())
+    print("Library: {0} shared parts for {1} mechs ({2} uses), {3:.2f} MB in {4:.2f}s".format(
+          len(items), len(mechs), uses, os.path.getsize(filepath) / (1024 * 1024), time.perf_counter() - start))
+    return manifest
+
+class SharedLibrary:
+    """ A part library opened for importing one mech (one or more .cdf files of a chassis).
+        Only the meshes it uses, and whose .dae hasn't changed since the library was built,
+        are linked.
+    """
+    def __init__(self, filepath, cdffiles, basedir):
+        self.filepath = filepath
+        self.basedir = basedir
+        with open(get_manifest_path(filepath)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != LIBRARY_VERSION:
+            raise ValueError("library built by another version, rebuild it")
+        self.items = {}
+        for cdffile in cdffiles:
+            for key, daefile in get_shared_bindings(cdffile, basedir).items():
+                item = manifest["items"].get(key)
+                if item is not None and tuple(item["stamp"]) == get_source_stamp(daefile):
+                    self.items[key] = item
+        names = sorted({record["mesh"] for item in self.items.values()
+                        for record in item["records"] if record["type"] == 'MESH'})
+        self.meshes = {}
+        if names:
+            with bpy.data.libraries.load(filepath, link=True, relative=bpy.data.is_saved) as (data_from, data_to):
+                data_to.meshes = [name for name in names if name in data_from.meshes]
+            self.meshes = {mesh.name: mesh for mesh in data_to.meshes if mesh is not None}
+
+    def has_part(self, daefile):
+        return normalize_asset_path(os.path.relpath(daefile, self.basedir)) in self.items
+
+    def create_part(self, daefile):
+        """ Creates the objects for a part from the library, the way import_collada_part()
+            would.  Returns None if the part isn't in the library, so it is imported as usual.
+        """
+        key = normalize_asset_path(os.path.relpath(daefile, self.basedir))
+        item = self.items.get(key)
+        if item is None:
+            return None
+        records = item["records"]
+        meshes = {i: self.meshes.get(record["mesh"]) for i, record in enumerate(records) if record["type"] == 'MESH'}
+        if None in meshes.values():
+            return None
+        objects = link_object_records(records, meshes)
+        for obj in objects:
+            obj["mech_library"] = key
+        return objects
+
+def open_library(filepath, cdffiles, basedir):
+    # Returns the SharedLibrary for a mech, or None (with a message) if it can't be used.
+    try:
+        return SharedLibrary(filepath, cdffiles, basedir)
+    except (OSError, ValueError, KeyError) as e:
+        print("Unable to use part library " + filepath + ": " + str(e))
+        return None
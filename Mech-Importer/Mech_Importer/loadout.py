@@ -0,0 +1,78 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Several loadouts of one chassis imported onto a single armature.
+
+import collections
+import xml.etree.ElementTree as ET
+
+import bpy
+
+from .utils import get_descendants, get_mech
+
+def get_attachment_key(geo):
+    # Two attachments are the same part if they bind the same file to the same bone in the same place.
+    return (geo.attrib["AName"], geo.attrib.get("Binding", "").replace('\\', '/').lower(),
+            geo.attrib.get("BoneName", ""), geo.attrib.get("Position", ""), geo.attrib.get("Rotation", ""))
+
+def get_loadout_attachments(cdffiles):
+    """ Splits the attachments of several .cdf files for one chassis into those they all
+        have in common and those specific to each.  Returns (common, {cdffile: specific}),
+        each a set of attachment keys.
+    """
+    keys = collections.OrderedDict()
+    for cdffile in cdffiles:
+        keys[cdffile] = {get_attachment_key(geo) for geo in ET.parse(cdffile).iter("Attachment")}
+    common = set.intersection(*keys.values())
+    return common, {cdffile: attachments - common for cdffile, attachments in keys.items()}
+
+def create_loadout_group(armature, cdffile, objects):
+    """ Puts the parts only one loadout has into a group named after its .cdf, and records
+        the loadout on the armature.  Returns the group.
+    """
+    loadout = get_mech(cdffile)
+    group = bpy.data.groups.new(loadout)
+    for obj in objects:
+        group.objects.link(obj)
+        obj["mech_loadout"] = loadout
+    armature["mech_loadouts"] = list(armature.get("mech_loadouts", [])) + [loadout]
+    # The group may have been renamed (atlas.001) if another mech already has the loadout.
+    groups = dict(armature.get("mech_loadout_groups", {}))
+    groups[loadout] = group.name
+    armature["mech_loadout_groups"] = groups
+    return group
+
+def get_loadouts(armature):
+    return list(armature.get("mech_loadouts", []))
+
+def show_loadout(armature, loadout):
+    """ Shows the parts of one loadout and hides those of the others.  Parts all the
+        loadouts share are left alone.  Objects added under a loadout's parts later (a
+        loaded cockpit) go with them.
+    """
+    groups = armature.get("mech_loadout_groups", {})
+    for name in get_loadouts(armature):
+        group = bpy.data.groups.get(groups.get(name, ""))
+        if group is None:
+            continue
+        for obj in group.objects:
+            for part in [obj] + get_descendants(obj):
+                part.hide = part.hide_render = name != loadout
+    armature["mech_loadout"] = loadout
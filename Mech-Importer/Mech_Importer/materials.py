@@ -0,0 +1,103 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Cycles materials built from a mech's .mtl files.
+
+import os
+import xml.etree.ElementTree as ET
+
+import bpy
+
+from .assets import get_asset_index
+
+TEXTURE_MAPS = ("Diffuse", "Specular", "Bumpmap")   # Texture maps wired into the materials
+
+def get_texture_path(basedir, texture):
+    # Texture elements point at the original .tif; the extracted game files are .dds.
+    # Returns None if the texture isn't in the game directory.
+    return get_asset_index(basedir).resolve(os.path.splitext(texture.attrib["File"])[0] + ".dds")
+
+def get_material_textures(matfile, basedir):
+    # Texture files a .mtl file will load, in the order create_materials loads them.
+    textures = []
+    for texture in ET.parse(matfile).iter("Texture"):
+        if texture.attrib.get("Map") in TEXTURE_MAPS:
+            texturefile = get_texture_path(basedir, texture)
+            if texturefile is not None:
+                textures.append(texturefile)
+    return textures
+
+def create_materials(matfile, basedir, prefetcher=None):
+    materials = {}
+    mats = ET.parse(matfile)
+    for mat in mats.iter("Material"):
+        if "Name" in mat.attrib:
+            # An actual material.  Create the material, set to nodes, clear and rebuild using the info from the material XML file.
+            name = mat.attrib["Name"]
+            matname = bpy.data.materials.new(mat.attrib["Name"])
+            materials[name] = matname
+            #print("Found material: " + matname.name)
+            matname.use_nodes = True
+            tree_nodes = matname.node_tree
+            links = tree_nodes.links
+
+            for n in tree_nodes.nodes:
+                tree_nodes.nodes.remove(n)
+
+            # Every material will have a PrincipledBSDF and Material output.  Add, place, and link.
+            shaderPrincipledBSDF = tree_nodes.nodes.new('ShaderNodeBsdfPrincipled')
+            shaderPrincipledBSDF.location =  300,500
+            shout=tree_nodes.nodes.new('ShaderNodeOutputMaterial')
+            shout.location = 500,500
+            links.new(shaderPrincipledBSDF.outputs[0], shout.inputs[0])
+            # For each Texture element, add the file and plug in to the appropriate slot on the PrincipledBSDF shader
+            for texture in mat.iter("Texture"):
+                #print("Adding texture " + texture.attrib["Map"])
+                if texture.attrib["Map"] not in TEXTURE_MAPS:
+                    continue
+                texturefile = get_texture_path(basedir, texture)
+                if texturefile is None:
+                    continue
+                if prefetcher is not None:
+                    prefetcher.take(texturefile)    # Read ahead into the OS cache for images.load
+                if texture.attrib["Map"] == "Diffuse":
+                    matDiffuse = bpy.data.images.load(filepath=texturefile, check_existing=True)
+                    shaderDiffImg = tree_nodes.nodes.new('ShaderNodeTexImage')
+                    shaderDiffImg.image=matDiffuse
+                    shaderDiffImg.location = 0,600
+                    links.new(shaderDiffImg.outputs[0], shaderPrincipledBSDF.inputs[0])
+                if texture.attrib["Map"] == "Specular":
+                    matSpec=bpy.data.images.load(filepath=texturefile, check_existing=True)
+                    shaderSpecImg=tree_nodes.nodes.new('ShaderNodeTexImage')
+                    shaderSpecImg.color_space = 'NONE'
+                    shaderSpecImg.image=matSpec
+                    shaderSpecImg.location = 0,325
+                    links.new(shaderSpecImg.outputs[0], shaderPrincipledBSDF.inputs[5])
+                if texture.attrib["Map"] == "Bumpmap":
+                    matNormal=bpy.data.images.load(filepath=texturefile, check_existing=True)
+                    shaderNormalImg=tree_nodes.nodes.new('ShaderNodeTexImage')
+                    shaderNormalImg.color_space = 'NONE'
+                    shaderNormalImg.image=matNormal
+                    shaderNormalImg.location = -100,0
+                    converterNormalMap=tree_nodes.nodes.new('ShaderNodeNormalMap')
+                    converterNormalMap.location = 100,0
+                    links.new(shaderNormalImg.outputs[0], converterNormalMap.inputs[1])
+                    links.new(converterNormalMap.outputs[0], shaderPrincipledBSDF.inputs[17])
+    return materials
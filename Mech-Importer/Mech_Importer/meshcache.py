@@ -0,0 +1,225 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Binary mesh sidecars, so warm imports skip the Collada importer.
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+import bpy
+import mathutils
+
+SIDECAR_EXT = ".mwomesh"       # Binary mesh cache written next to each converted .dae
+SIDECAR_MAGIC = b"MWOM"
+SIDECAR_VERSION = 3         # 2: object records carry the parent inverse, 3: every UV layer
+SIDECAR_HEADER = struct.Struct("<4sIqqI")   # magic, version, source mtime (ns), source size, TOC length
+SIDECAR_ALIGN = 16
+
+def get_sidecar_path(daefile):
+    return daefile + SIDECAR_EXT
+
+def get_source_stamp(daefile):
+    # mtime and size of a converted .dae, used to invalidate its sidecar.
+    st = os.stat(daefile)
+    return st.st_mtime_ns, st.st_size
+
+class MeshSidecar:
+    """ A sidecar opened for reading.  The arrays handed out are views into the
+        memory-mapped file and stay valid until close() is called.
+    """
+    def __init__(self, buffer, records, data_start, mapping=None):
+        self.records = records
+        self._mapping = mapping
+        self._buffer = memoryview(buffer)
+        self._data_start = data_start
+        self._views = []
+
+    def array(self, record, name):
+        offset, typecode, count = record["arrays"][name]
+        start = self._data_start + offset
+        view = self._buffer[start:start + count * array.array(typecode).itemsize].cast(typecode)
+        self._views.append(view)
+        return view
+
+    @property
+    def size(self):
+        return len(self._buffer)
+
+    def touch(self):
+        # Fault the mapped pages in now (the prefetcher does this on a worker thread), so
+        # building the meshes doesn't wait on the disk.
+        for offset in range(0, len(self._buffer), mmap.PAGESIZE):
+            self._buffer[offset]
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        del self._views[:]
+        self._buffer.release()
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+def get_object_records(objects):
+    # Name, type, parent (index into objects), parent inverse and local matrix of each object,
+    # plus the mesh name for meshes.  link_object_records() turns these back into objects.
+    index = {obj.name: i for i, obj in enumerate(objects)}
+    records = []
+    for obj in objects:
+        record = {"name": obj.name,
+                  "type": obj.type,
+                  "parent": index.get(obj.parent.name, -1) if obj.parent is not None else -1,
+                  "parent_inverse": [value for row in obj.matrix_parent_inverse for value in row],
+                  "matrix": [value for row in obj.matrix_basis for value in row]}
+        if obj.type == 'MESH':
+            record["mesh"] = obj.data.name
+        records.append(record)
+    return records
+
+def write_mesh_sidecar(daefile, objects):
+    """ Writes the objects just created by importing daefile to its binary sidecar.
+        Returns the sidecar path, or None if the part has objects the sidecar can't hold.
+    """
+    if any(obj.type not in ('MESH', 'EMPTY') for obj in objects):
+        return None
+    blobs = []
+    records = get_object_records(objects)
+    offset = 0
+    for obj, record in zip(objects, records):
+        if obj.type == 'MESH':
+            mesh = obj.data
+            nverts, nloops, npolys = len(mesh.vertices), len(mesh.loops), len(mesh.polygons)
+            arrays = [("co", mesh.vertices, 'f', nverts * 3),
+                      ("normal", mesh.vertices, 'f', nverts * 3),
+                      ("vertex_index", mesh.loops, 'i', nloops),
+                      ("loop_start", mesh.polygons, 'i', npolys),
+                      ("loop_total", mesh.polygons, 'i', npolys),
+                      ("material_index", mesh.polygons, 'i', npolys),
+                      ("use_smooth", mesh.polygons, 'b', npolys)]
+            # Every UV layer, in order, under its own name.
+            record["uv_layers"] = [layer.name for layer in mesh.uv_layers]
+            record["uv_active"] = mesh.uv_textures.active_index
+            for i, layer in enumerate(mesh.uv_layers):
+                arrays.append(("uv" + str(i), layer.data, 'f', nloops * 2))
+            record["counts"] = [nverts, nloops, npolys]
+            record["materials"] = [mat.name if mat is not None else "" for mat in mesh.materials]
+            record["arrays"] = {}
+            for name, collection, typecode, count in arrays:
+                data = array.array(typecode, [0]) * count
+                collection.foreach_get(name, data)
+                record["arrays"][name] = [offset, typecode, count]
+                blobs.append(data)
+                offset += len(data) * data.itemsize
+                padding = -offset % SIDECAR_ALIGN
+                if padding:
+                    blobs.append(bytes(padding))
+                    offset += padding
+
+    toc = json.dumps({"byteorder": sys.byteorder, "objects": records}).encode("utf-8")
+    mtime, size = get_source_stamp(daefile)
+    header = SIDECAR_HEADER.pack(SIDECAR_MAGIC, SIDECAR_VERSION, mtime, size, len(toc))
+    sidecar = get_sidecar_path(daefile)
+    tmpfile = sidecar + ".tmp"
+    with open(tmpfile, 'wb') as f:
+        f.write(header)
+        f.write(toc)
+        f.write(bytes(-(len(header) + len(toc)) % SIDECAR_ALIGN))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmpfile, sidecar)
+    return sidecar
+
+def read_mesh_sidecar(daefile, data=None):
+    """ Opens the sidecar for daefile.  Returns a MeshSidecar, or None if there is no
+        sidecar or it is out of date.  If data is given it is used instead of mapping the file.
+    """
+    mapping = None
+    try:
+        stamp = get_source_stamp(daefile)
+        if data is None:
+            with open(get_sidecar_path(daefile), 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            data = mapping
+        magic, version, mtime, size, toc_length = SIDECAR_HEADER.unpack_from(data, 0)
+        if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION or (mtime, size) != stamp:
+            raise ValueError("stale sidecar")
+        toc_end = SIDECAR_HEADER.size + toc_length
+        toc = json.loads(bytes(data[SIDECAR_HEADER.size:toc_end]).decode("utf-8"))
+        if toc["byteorder"] != sys.byteorder:
+            raise ValueError("sidecar written on a different platform")
+    except (OSError, ValueError, KeyError, struct.error):
+        # Missing, truncated or stale.  Fall back to the .dae.
+        if mapping is not None:
+            mapping.close()
+        return None
+    data_start = toc_end + (-toc_end % SIDECAR_ALIGN)
+    return MeshSidecar(data, toc["objects"], data_start, mapping)
+
+def create_mesh_from_sidecar(sidecar, record):
+    nverts, nloops, npolys = record["counts"]
+    mesh = bpy.data.meshes.new(record["mesh"])
+    mesh.vertices.add(nverts)
+    mesh.loops.add(nloops)
+    mesh.polygons.add(npolys)
+    mesh.vertices.foreach_set("co", sidecar.array(record, "co"))
+    mesh.loops.foreach_set("vertex_index", sidecar.array(record, "vertex_index"))
+    for name in ("loop_start", "loop_total", "material_index", "use_smooth"):
+        mesh.polygons.foreach_set(name, sidecar.array(record, name))
+    for i, name in enumerate(record["uv_layers"]):
+        mesh.uv_textures.new(name)
+        mesh.uv_layers[i].data.foreach_set("uv", sidecar.array(record, "uv" + str(i)))
+    if record["uv_layers"]:
+        mesh.uv_textures.active_index = record["uv_active"]
+    mesh.update(calc_edges=True)
+    mesh.vertices.foreach_set("normal", sidecar.array(record, "normal"))
+    for name in record["materials"]:
+        # The Collada importer creates these by name; reuse them rather than piling up .001 copies.
+        mat = bpy.data.materials.get(name) if name else None
+        if name and mat is None:
+            mat = bpy.data.materials.new(name)
+        mesh.materials.append(mat)
+    return mesh
+
+def link_object_records(records, meshes):
+    """ Creates, links and selects the objects described by sidecar records, the way the
+        Collada importer leaves them.  meshes maps record index to mesh data.  Returns the objects.
+    """
+    scene = bpy.context.scene
+    for obj in scene.objects:
+        obj.select = False
+    objects = []
+    for i, record in enumerate(records):
+        obj = bpy.data.objects.new(record["name"], meshes.get(i))
+        scene.objects.link(obj)
+        objects.append(obj)
+    for obj, record in zip(objects, records):
+        if record["parent"] >= 0:
+            obj.parent = objects[record["parent"]]
+            # The Collada importer doesn't always leave an identity parent inverse.
+            m = record["parent_inverse"]
+            obj.matrix_parent_inverse = mathutils.Matrix((m[0:4], m[4:8], m[8:12], m[12:16]))
+        m = record["matrix"]
+        obj.matrix_basis = mathutils.Matrix((m[0:4], m[4:8], m[8:12], m[12:16]))
+        obj.select = True
+    return objects
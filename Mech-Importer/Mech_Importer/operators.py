@@ -0,0 +1,436 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+#
+
+# The add-on's operators and menus.
+
+import bpy
+import importlib
+import os
+from bpy.props import (
+        BoolProperty,
+        CollectionProperty,
+        IntProperty,
+        StringProperty,
+        EnumProperty,
+        )
+from bpy_extras.io_utils import (
+        ImportHelper,
+        ExportHelper,
+        path_reference_mode,
+        )
+
+# Only these operators and menus are set up when the add-on is enabled.  The modules that do the
+# work (and their imports: xml, mmap, threads, hashing) are loaded the first time an operator runs.
+
+def load_module(operator, name):
+    """ Import a submodule of the add-on, reporting on the operator if it can't be loaded
+    """
+    try:
+        return importlib.import_module("." + name, __package__)
+    except ImportError as e:
+        operator.report({'ERROR'}, "Mech Importer: unable to load " + name + " (" + str(e) + ")")
+        return None
+
+def find_armature(operator, context):
+    """ The active mech's armature, or None after reporting that there isn't one
+    """
+    utils = load_module(operator, "utils")
+    armature = utils.find_mech_armature(context) if utils is not None else None
+    if armature is None and utils is not None:
+        operator.report({'ERROR'}, "No mech armature found")
+    return armature
+
+class MechImporter(bpy.types.Operator, ImportHelper):
+    """ Create a mech from MWO"""
+    bl_idname = "import_scene.mech"
+    bl_label = "Import Mech"
+    bl_options = {'PRESET', 'UNDO'}
+    filename_ext = ".cdf"
+    filter_glob = StringProperty(
+        default="*.cdf",
+        options={'HIDDEN'},
+        )
+    files = CollectionProperty(type=bpy.types.OperatorFileListElement)
+    directory = StringProperty(subtype='DIR_PATH')
+
+    texture_type = EnumProperty(
+        name="Texture Type",
+        description = "Identify the type of texture file imported into the Texture nodes.",
+        items = (('ON', "DDS", "Reference DDS files for textures."),
+                 ('OFF', "TIF", "Reference TIF files for textures."),
+                 ),
+        )
+
+    use_mesh_cache = BoolProperty(
+        name="Use Mesh Cache",
+        description="Load parts from binary sidecars next to the .dae files, writing them on first import",
+        default=True,
+        )
+
+    prefetch_lookahead = IntProperty(
+        name="Prefetch Lookahead",
+        description="Number of upcoming part and texture files read in the background (0 reads on demand)",
+        default=4,
+        min=0,
+        max=64,
+        )
+
+    prefetch_memory = IntProperty(
+        name="Prefetch Memory (MB)",
+        description="Most file data held in memory by the background reader",
+        default=256,
+        min=1,
+        max=4096,
+        )
+
+    rescan_assets = BoolProperty(
+        name="Rescan Game Files",
+        description="Rebuild the index of the game directory before importing (use after extracting or converting files)",
+        default=False,
+        )
+
+    cleanup = BoolProperty(
+        name="Clean Up",
+        description="Remove the empties, meshes, materials and images the import leaves unused",
+        default=False,
+        )
+
+    texture_packing = EnumProperty(
+        name="Textures",
+        description="What to do with the imported textures after cleaning up",
+        items = (('NONE', "Leave", "Leave textures as they were loaded"),
+                 ('PACK', "Pack", "Pack all imported textures into the .blend file"),
+                 ('UNPACK', "Unpack", "Reference all imported textures from disk"),
+                 ),
+        default='NONE',
+        )
+
+    viewport_profile = EnumProperty(
+        name="Viewport",
+        description="Viewport display settings for the imported mech",
+        items = (('FULL', "Full Quality", "Material shading and full detail"),
+                 ('PERFORMANCE', "Performance", "Bounds for proxies and weapons, wire widgets, simplify and a texture size cap"),
+                 ),
+        default='FULL',
+        )
+
+    rig_type = EnumProperty(
+        name="Rig",
+        description="How much rigging to build on the armature",
+        items = (('FULL', "Full", "IK chains, constraints and bone widgets for animating"),
+                 ('PROXY', "Proxy", "FK only, no constraints or widgets, for playing back baked motion"),
+                 ),
+        default='FULL',
+        )
+
+    convert = BoolProperty(
+        name="Convert Files",
+        description="Run the converter on the mech's .cga/.cgf files that have no .dae or an older one",
+        default=False,
+        )
+
+    converter_command = StringProperty(
+        name="Converter",
+        description="Command run for each file.  {source}, {dae} and {basedir} are replaced with the paths",
+        default='cgf-converter "{source}" -dae -objectdir "{basedir}"',
+        )
+
+    converter_jobs = IntProperty(
+        name="Converter Jobs",
+        description="Number of converters run at the same time",
+        default=2,
+        min=1,
+        max=32,
+        )
+
+    library = StringProperty(
+        name="Part Library",
+        description="Shared part library .blend to link weapons and generic parts from (empty imports them)",
+        subtype='FILE_PATH',
+        )
+
+    path_mode = path_reference_mode
+    check_extension = True
+    def execute(self, context):
+        if self.texture_type == 'OFF':
+            self.use_tif = False
+        else:
+            self.use_dds = False
+        keywords = {"use_mesh_cache": self.use_mesh_cache,
+                    "prefetch_lookahead": self.prefetch_lookahead,
+                    "prefetch_memory": self.prefetch_memory,
+                    "rescan_assets": self.rescan_assets,
+                    "cleanup": self.cleanup,
+                    "texture_packing": self.texture_packing,
+                    "viewport_profile": self.viewport_profile,
+                    "rig_type": self.rig_type,
+                    "library": bpy.path.abspath(self.library)}
+        if self.convert:
+            keywords["converter_command"] = self.converter_command
+            keywords["converter_jobs"] = self.converter_jobs
+        if bpy.data.is_saved and context.user_preferences.filepaths.use_relative_paths:
+            keywords["relpath"] = os.path.dirname(bpy.data.filepath)
+        importer = load_module(self, "importer")
+        if importer is None:
+            return {'CANCELLED'}
+        fdir = self.properties.filepath
+        #keywords["cdffile"] = fdir
+        filepaths = [os.path.join(self.directory, f.name) for f in self.files if f.name]
+        if len(filepaths) > 1:
+            # Several loadouts of one chassis.  The chassis' own .cdf (atlas, not atlas_movie)
+            # has the shortest name, and the body files are named after it.
+            filepaths.sort(key=len)
+            fdir = filepaths[0]
+            keywords["loadouts"] = filepaths[1:]
+        return importer.import_mech(context, fdir, **keywords)
+
+    def draw(self, context):
+        layout = self.layout
+
+        row = layout.row(align = True)
+        box = layout.box()
+        box.label("Select texture type")
+        row = box.row()
+        row.prop(self, "texture_type", expand = True)
+
+        box = layout.box()
+        box.label("Conversion")
+        box.prop(self, "convert")
+        col = box.column()
+        col.enabled = self.convert
+        col.prop(self, "converter_command", text="")
+        col.prop(self, "converter_jobs")
+
+        box = layout.box()
+        box.label("Performance")
+        box.prop(self, "use_mesh_cache")
+        box.prop(self, "prefetch_lookahead")
+        box.prop(self, "prefetch_memory")
+        box.prop(self, "rescan_assets")
+        box.prop(self, "library")
+        box.prop(self, "viewport_profile")
+        box.prop(self, "rig_type")
+
+        box = layout.box()
+        box.label("Cleanup")
+        box.prop(self, "cleanup")
+        row = box.row()
+        row.enabled = self.cleanup
+        row.prop(self, "texture_packing")
+
+class MechGLBExporter(bpy.types.Operator, ExportHelper):
+    """ Export the active mech to a binary glTF file"""
+    bl_idname = "export_scene.mech_glb"
+    bl_label = "Export Mech (.glb)"
+    filename_ext = ".glb"
+    filter_glob = StringProperty(
+        default="*.glb",
+        options={'HIDDEN'},
+        )
+
+    def execute(self, context):
+        export_glb = load_module(self, "export_glb")
+        armature = find_armature(self, context)
+        if export_glb is None or armature is None:
+            return {'CANCELLED'}
+        if context.object is not None and context.object.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        stats = export_glb.export_mech_glb(armature, self.filepath)
+        self.report({'INFO'}, "Exported {0:.2f} MB in {1:.2f}s".format(stats["bytes"] / (1024 * 1024), stats["seconds"]))
+        return {'FINISHED'}
+
+class MechAnimationImporter(bpy.types.Operator, ImportHelper):
+    """ Import Collada animation clips onto the active mech's rig"""
+    bl_idname = "import_anim.mech"
+    bl_label = "Import Mech Animation"
+    bl_options = {'UNDO'}
+    filename_ext = ".dae"
+    filter_glob = StringProperty(
+        default="*.dae",
+        options={'HIDDEN'},
+        )
+    files = CollectionProperty(type=bpy.types.OperatorFileListElement)
+    directory = StringProperty(subtype='DIR_PATH')
+
+    mute_constraints = BoolProperty(
+        name="Mute IK Constraints",
+        description="Mute the rig's constraints so the imported keys drive the bones",
+        default=True,
+        )
+
+    def execute(self, context):
+        animation = load_module(self, "animation")
+        armature = find_armature(self, context)
+        if animation is None or armature is None:
+            return {'CANCELLED'}
+        filepaths = [os.path.join(self.directory, f.name) for f in self.files if f.name] or [self.filepath]
+        if context.object is not None and context.object.mode == 'EDIT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        actions = animation.import_animations(filepaths, armature, self.mute_constraints)
+        self.report({'INFO'}, "Imported " + str(len(actions)) + " animation(s)")
+        return {'FINISHED'}
+
+class MechViewportProfile(bpy.types.Operator):
+    """ Switch the active mech between full quality and performance viewport display"""
+    bl_idname = "object.mech_viewport_profile"
+    bl_label = "Mech Viewport Profile"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    profile = EnumProperty(
+        name="Profile",
+        items = (('FULL', "Full Quality", "Material shading and full detail"),
+                 ('PERFORMANCE', "Performance", "Bounds for proxies and weapons, wire widgets, simplify and a texture size cap"),
+                 ),
+        default='PERFORMANCE',
+        )
+
+    def execute(self, context):
+        viewport = load_module(self, "viewport")
+        armature = find_armature(self, context)
+        if viewport is None or armature is None:
+            return {'CANCELLED'}
+        viewport.apply_viewport_profile(armature, self.profile)
+        return {'FINISHED'}
+
+class MechCockpit(bpy.types.Operator):
+    """ Load or unload the active mech's cockpit"""
+    bl_idname = "object.mech_cockpit"
+    bl_label = "Mech Cockpit"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    action = EnumProperty(
+        name="Action",
+        items = (('LOAD', "Load", "Import the cockpit geometry and materials"),
+                 ('UNLOAD', "Unload", "Remove the cockpit, leaving its placeholder"),
+                 ),
+        default='LOAD',
+        )
+
+    def execute(self, context):
+        geometry = load_module(self, "geometry")
+        if geometry is None:
+            return {'CANCELLED'}
+        placeholder = geometry.find_cockpit_placeholder(context)
+        if placeholder is None:
+            self.report({'ERROR'}, "No cockpit placeholder found")
+            return {'CANCELLED'}
+        if context.object is not None and context.object.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        if self.action == 'LOAD':
+            if not geometry.load_cockpit(placeholder):
+                self.report({'WARNING'}, "Cockpit is already loaded or was not found")
+        else:
+            geometry.unload_cockpit(placeholder)
+        return {'FINISHED'}
+
+class MechProxyRig(bpy.types.Operator):
+    """ Convert the active mech's rig to an FK-only proxy rig, baking its IK motion"""
+    bl_idname = "object.mech_proxy_rig"
+    bl_label = "Convert to Proxy Rig"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    benchmark = BoolProperty(
+        name="Benchmark",
+        description="Time scene evaluation per frame before and after converting",
+        default=False,
+        )
+
+    def execute(self, context):
+        rig = load_module(self, "rig")
+        armature = find_armature(self, context)
+        if rig is None or armature is None:
+            return {'CANCELLED'}
+        if self.benchmark:
+            before = rig.benchmark_rig()
+        rig.convert_to_proxy_rig(armature)
+        if self.benchmark:
+            after = rig.benchmark_rig()
+            message = "Frame evaluation: {0:.2f} ms full rig, {1:.2f} ms proxy rig".format(before, after)
+            print(message)
+            self.report({'INFO'}, message)
+        return {'FINISHED'}
+
+loadout_items = []    # Blender doesn't keep the strings of dynamic enum items alive itself.
+
+def get_loadout_items(self, context):
+    armature = importlib.import_module(".utils", __package__).find_mech_armature(context)
+    names = armature.get("mech_loadouts", []) if armature is not None else []
+    loadout_items[:] = [(name, name, "Show the " + name + " loadout") for name in names]
+    return loadout_items
+
+class MechLoadout(bpy.types.Operator):
+    """ Show one of the active mech's loadouts and hide the others"""
+    bl_idname = "object.mech_loadout"
+    bl_label = "Mech Loadout"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    loadout = EnumProperty(
+        name="Loadout",
+        items=get_loadout_items,
+        )
+
+    def execute(self, context):
+        loadout = load_module(self, "loadout")
+        armature = find_armature(self, context)
+        if loadout is None or armature is None:
+            return {'CANCELLED'}
+        if self.loadout not in loadout.get_loadouts(armature):
+            self.report({'ERROR'}, "The mech has no loadout called " + self.loadout)
+            return {'CANCELLED'}
+        loadout.show_loadout(armature, self.loadout)
+        return {'FINISHED'}
+
+def menu_func_mech(self, context):
+    self.layout.operator_menu_enum(MechViewportProfile.bl_idname, "profile")
+    self.layout.operator_menu_enum(MechCockpit.bl_idname, "action")
+    self.layout.operator(MechProxyRig.bl_idname)
+    self.layout.operator_menu_enum(MechLoadout.bl_idname, "loadout")
+
+def menu_func_import(self, context):
+    self.layout.operator(MechImporter.bl_idname, text="Import Mech")
+    self.layout.operator(MechAnimationImporter.bl_idname, text="Import Mech Animation (.dae)")
+
+def menu_func_export(self, context):
+    self.layout.operator(MechGLBExporter.bl_idname, text="Mech (.glb)")
+
+def register():
+    bpy.utils.register_class(MechImporter)
+    bpy.utils.register_class(MechAnimationImporter)
+    bpy.types.INFO_MT_file_import.append(menu_func_import)
+    bpy.utils.register_class(MechGLBExporter)
+    bpy.types.INFO_MT_file_export.append(menu_func_export)
+    bpy.utils.register_class(MechViewportProfile)
+    bpy.utils.register_class(MechCockpit)
+    bpy.utils.register_class(MechProxyRig)
+    bpy.utils.register_class(MechLoadout)
+    bpy.types.VIEW3D_MT_object.append(menu_func_mech)
+
+def unregister():
+    bpy.types.VIEW3D_MT_object.remove(menu_func_mech)
+    bpy.utils.unregister_class(MechLoadout)
+    bpy.utils.unregister_class(MechProxyRig)
+    bpy.utils.unregister_class(MechCockpit)
+    bpy.utils.unregister_class(MechViewportProfile)
+    bpy.types.INFO_MT_file_export.remove(menu_func_export)
+    bpy.utils.unregister_class(MechGLBExporter)
+    bpy.types.INFO_MT_file_import.remove(menu_func_import)
+    bpy.utils.unregister_class(MechAnimationImporter)
+    bpy.utils.unregister_class(MechImporter)
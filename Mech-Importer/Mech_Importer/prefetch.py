@@ -0,0 +1,160 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Background reading of the files an import is about to need.
+
+import collections
+import os
+import time
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None   # No threads available; the prefetcher reads on demand.
+
+from .meshcache import get_sidecar_path, read_mesh_sidecar
+
+PREFETCH_CHUNK = 1024 * 1024   # Read size used to warm the OS cache
+
+def warm_file(path):
+    # Reads a file and drops the data, so the read that follows comes from the OS cache.
+    # Returns the number of bytes read.
+    nbytes = 0
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                chunk = f.read(PREFETCH_CHUNK)
+                if not chunk:
+                    return nbytes
+                nbytes += len(chunk)
+    except OSError:
+        return nbytes
+
+def read_prefetch_file(path, use_mesh_cache=True):
+    # Runs on a worker thread, so file I/O and sidecar parsing only.  Never touch bpy here.
+    # Parts with a current sidecar come back mapped, with their pages already read in.
+    # Anything else (textures, parts without a sidecar) is only read to warm the OS cache,
+    # since images.load and the Collada importer read the file themselves.
+    # Returns (sidecar or None, bytes read, bytes held).
+    if use_mesh_cache and path.endswith(".dae"):
+        sidecar = read_mesh_sidecar(path)
+        if sidecar is not None:
+            sidecar.touch()
+            return sidecar, sidecar.size, sidecar.size
+    return None, warm_file(path), 0
+
+def get_held_size(path, use_mesh_cache=True):
+    # What read_prefetch_file will hold for path until it is taken: only sidecars.
+    if use_mesh_cache and path.endswith(".dae"):
+        try:
+            return os.path.getsize(get_sidecar_path(path))
+        except OSError:
+            pass
+    return 0
+
+class AttachmentPrefetcher:
+    """ Reads upcoming part and texture files on worker threads while the main thread
+        creates objects.  Files are taken in (roughly) the order given; at most lookahead
+        files are in flight and memory_cap bytes of mapped sidecars held at once.  With a
+        lookahead of 0 every take() maps the sidecar synchronously, which gives the baseline
+        I/O wait to compare against.
+    """
+    def __init__(self, paths, lookahead=4, memory_cap=256 * 1024 * 1024, workers=2, use_mesh_cache=True):
+        self.lookahead = lookahead
+        self.memory_cap = memory_cap
+        self.use_mesh_cache = use_mesh_cache
+        self.io_wait = 0.0      # Seconds the main thread spent waiting on reads
+        self.bytes_read = 0
+        self.hits = 0
+        self.misses = 0
+        self._pending = collections.deque(collections.OrderedDict.fromkeys(paths))
+        self._futures = {}
+        self._taken = set()
+        self._held = 0
+        if lookahead > 0 and ThreadPoolExecutor is not None:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            self._executor = None
+        self._fill()
+
+    def _fill(self):
+        if self._executor is None:
+            return
+        # Swap the estimates for what finished reads actually hold (a stale sidecar holds nothing).
+        for entry in self._futures.values():
+            future, size = entry
+            if future.done() and future.exception() is None:
+                held = future.result()[2]
+                self._held += held - size
+                entry[1] = held
+        while self._pending and len(self._futures) < self.lookahead:
+            path = self._pending[0]
+            size = get_held_size(path, self.use_mesh_cache)
+            # Always allow one file in flight, however big, so the window can't stall.
+            if self._futures and self._held + size > self.memory_cap:
+                break
+            self._pending.popleft()
+            self._futures[path] = [self._executor.submit(read_prefetch_file, path, self.use_mesh_cache), size]
+            self._held += size
+
+    def take(self, path):
+        """ Returns the MeshSidecar read for path, or None if it has no current sidecar (the
+            file has only been read into the OS cache), could not be read or was already taken.
+        """
+        if path in self._taken:
+            return None
+        self._taken.add(path)
+        start = time.perf_counter()
+        entry = self._futures.pop(path, None)
+        if entry is not None:
+            self.hits += 1
+            future, size = entry
+            data, nbytes, held = future.result()
+            self._held -= size     # What was accounted for it, estimate or actual
+        else:
+            self.misses += 1
+            if path in self._pending:
+                self._pending.remove(path)
+            # Nothing to gain from warming the cache now; just map the sidecar, if there is one.
+            data = read_mesh_sidecar(path) if self.use_mesh_cache and path.endswith(".dae") else None
+            nbytes = data.size if data is not None else 0
+        self.io_wait += time.perf_counter() - start
+        self.bytes_read += nbytes
+        self._fill()
+        return data
+
+    def close(self):
+        # Drop anything that was read but never used.
+        self._pending.clear()
+        for future, size in self._futures.values():
+            if not future.cancel():
+                data, nbytes, held = future.result()
+                if data is not None:
+                    data.close()
+        self._futures.clear()
+        self._held = 0
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def report(self):
+        return ("Prefetch: {0} files ({1} hits, {2} misses), {3:.1f} MB read, "
+                "{4:.3f}s waiting on I/O (lookahead {5})").format(
+                    self.hits + self.misses, self.hits, self.misses,
+                    self.bytes_read / (1024 * 1024), self.io_wait, self.lookahead)
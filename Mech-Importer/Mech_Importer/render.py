@@ -0,0 +1,162 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Headless turnaround renders for the mech catalog.
+
+import json
+import math
+import os
+import time
+from math import radians
+
+import bpy
+import mathutils
+
+from .importer import import_mech
+from .utils import get_body_dir, get_mech, get_mech_objects
+
+CATALOG_CAMERA = "Catalog_Camera"
+CATALOG_SUN = "Catalog_Sun"
+
+def get_mech_bounds(armature, layers=(0, 1)):
+    """ Returns the world space center and bounding sphere radius of the mech's visible
+        geometry (body and weapon layers).
+    """
+    corners = [obj.matrix_world * mathutils.Vector(corner)
+               for obj in get_mech_objects(armature)
+               if obj.type == 'MESH' and not obj.hide_render and any(obj.layers[i] for i in layers)
+               for corner in obj.bound_box]
+    if not corners:
+        return armature.matrix_world.to_translation(), 1.0
+    low = mathutils.Vector([min(c[i] for c in corners) for i in range(3)])
+    high = mathutils.Vector([max(c[i] for c in corners) for i in range(3)])
+    center = (low + high) / 2
+    return center, (high - low).length / 2
+
+def reset_scene():
+    """ Removes every object and the data left without users, so the next mech can be
+        imported into the same Blender session.
+    """
+    if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    collections = (bpy.data.meshes, bpy.data.armatures, bpy.data.materials, bpy.data.textures,
+                   bpy.data.images, bpy.data.cameras, bpy.data.lamps, bpy.data.actions)
+    removed = True
+    while removed:
+        # Removing one block can free others (mesh -> material -> image), so repeat.
+        removed = False
+        for collection in collections:
+            for block in list(collection):
+                if block.users == 0:
+                    collection.remove(block)
+                    removed = True
+
+def setup_catalog_render(scene, samples=16, resolution=512):
+    # Low sample, denoised CPU Cycles.  Good enough for catalog thumbnails.
+    scene.render.engine = 'CYCLES'
+    scene.cycles.device = 'CPU'
+    scene.cycles.samples = samples
+    scene.cycles.max_bounces = 4
+    scene.cycles.caustics_reflective = False
+    scene.cycles.caustics_refractive = False
+    scene.cycles.film_transparent = True
+    scene.render.layers.active.cycles.use_denoising = True
+    scene.render.tile_x = 32
+    scene.render.tile_y = 32
+    scene.render.resolution_x = resolution
+    scene.render.resolution_y = resolution
+    scene.render.resolution_percentage = 100
+    scene.render.image_settings.file_format = 'PNG'
+    scene.render.image_settings.color_mode = 'RGBA'
+    # Render the body and weapons, not proxies, helpers or widgets.
+    scene.layers = [x in (0, 1) for x in range(0, 20)]
+
+def create_catalog_rig(scene):
+    camera = bpy.data.objects.new(CATALOG_CAMERA, bpy.data.cameras.new(CATALOG_CAMERA))
+    scene.objects.link(camera)
+    sun = bpy.data.objects.new(CATALOG_SUN, bpy.data.lamps.new(CATALOG_SUN, 'SUN'))
+    sun.rotation_euler = (radians(50), 0, radians(30))
+    scene.objects.link(sun)
+    for obj in (camera, sun):
+        obj.layers = [x == 0 for x in range(0, 20)]
+    scene.camera = camera
+    return camera
+
+def render_turnaround(armature, output_dir, name, angles=8, samples=16, resolution=512, elevation=15.0):
+    """ Frames the mech from its bounds and renders it from angles evenly spaced views around it.
+        Returns a list of {"angle", "image", "seconds"} entries.
+    """
+    scene = bpy.context.scene
+    setup_catalog_render(scene, samples, resolution)
+    camera = create_catalog_rig(scene)
+    center, radius = get_mech_bounds(armature)
+    # Back off far enough that the bounding sphere fits the field of view, plus a small margin.
+    distance = 1.1 * radius / math.sin(camera.data.angle / 2)
+    pitch = radians(elevation)
+    images = []
+    for i in range(angles):
+        heading = 2 * math.pi * i / angles
+        offset = mathutils.Vector((math.sin(heading) * math.cos(pitch),
+                                   -math.cos(heading) * math.cos(pitch),
+                                   math.sin(pitch)))
+        camera.location = center + offset * distance
+        camera.rotation_mode = 'QUATERNION'
+        camera.rotation_quaternion = (-offset).to_track_quat('-Z', 'Y')
+        camera.data.clip_end = distance + 2 * radius
+        image = os.path.join(output_dir, "{0}_{1:03d}.png".format(name, int(round(math.degrees(heading)))))
+        scene.render.filepath = image
+        start = time.perf_counter()
+        bpy.ops.render.render(write_still=True)
+        images.append({"angle": math.degrees(heading), "image": image,
+                       "seconds": time.perf_counter() - start})
+    return images
+
+def render_catalog(cdffiles, output_dir, angles=8, samples=16, resolution=512, library=""):
+    """ Imports and renders each mech in turn in this Blender session, resetting the scene
+        between them.  Writes catalog.json in output_dir after each mech, so an interrupted
+        run still leaves an index of what finished.  Returns the index entries.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    index_file = os.path.join(output_dir, "catalog.json")
+    catalog = []
+    for cdffile in cdffiles:
+        mech = get_mech(cdffile)
+        entry = {"mech": mech, "cdf": cdffile}
+        try:
+            reset_scene()
+            start = time.perf_counter()
+            if import_mech(bpy.context, cdffile, library=library) is False:
+                raise RuntimeError("armature not found: " + os.path.join(get_body_dir(cdffile), mech + ".dae"))
+            bpy.ops.object.mode_set(mode='OBJECT')
+            entry["import_seconds"] = time.perf_counter() - start
+            images = render_turnaround(bpy.data.objects['Armature'], output_dir, mech, angles, samples, resolution)
+            entry["images"] = images
+            entry["render_seconds"] = sum(image["seconds"] for image in images)
+        except Exception as e:
+            # Keep going; one broken mech shouldn't cost the rest of the night.
+            entry["error"] = str(e)
+        print("Catalog: " + mech + " " + ("failed: " + entry["error"] if "error" in entry else
+              "rendered in {0:.1f}s".format(entry["render_seconds"])))
+        catalog.append(entry)
+        with open(index_file, 'w') as f:
+            json.dump(catalog, f, indent=2)
+    return catalog
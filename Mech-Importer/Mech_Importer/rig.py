@@ -17,114 +17,15 @@
 # ##### END GPL LICENSE BLOCK #####
 
 # <pep8 compliant>
-#
 
-# Mech Importer 2.0 (Blender Python module)
-# https://www.heffaypresents.com/GitHub
+# The armature, its IK rig and bone widgets, and the FK-only proxy rig.
+
+import time
 
 import bpy
-import bpy.types
-import bpy.utils
-import types
-import bmesh
-import math
 import mathutils
-import array
-import os
-import time
-import xml.etree as etree
-import xml.etree.ElementTree as ET
-from bpy_extras.io_utils import unpack_list
-from bpy_extras.image_utils import load_image
-from progress_report import ProgressReport, ProgressReportSubstep
-from bpy.props import (
-        BoolProperty,
-        FloatProperty,
-        StringProperty,
-        EnumProperty,
-        )
-from bpy_extras.io_utils import (
-        ImportHelper,
-        ExportHelper,
-        orientation_helper_factory,
-        path_reference_mode,
-        axis_conversion,
-        )
-from math import radians
-
-bl_info = {
-    "name": "Mech Importer", 
-    "category": "Import-Export",
-    'author': 'Geoff Gerber',
-    'version': (0, 1, 0),
-    'blender': (2, 7, 9),
-    'description': "Import MWO mechs",
-    "location": "File > Import-Export"
-    }
-
-# store keymaps here to access after registration
-addon_keymaps = []
-# There are misspelled words (missle).  Just an FYI.
-weapons = [ "hero","missile", "missle", "narc","uac", "uac2", "uac5", "uac10", "uac20", "rac", "_lty",
-           "ac2","ac5","ac10","ac20","gauss","ppc","flamer","_mg","_lbx", "damaged", "_mount",
-           "laser","ams","_phoenix","blank","invasion", "hmg", "lmg", "lams", "hand", "barrel" ]
-control_bones = [ "Hand_IK.L", "Hand_IK.R", "Bip01", "Hip_Root", "Bip01_Pitch", "Bip01_Pelvis",
-                 "Knee_IK.R", "Knee_IK.L", "Foot_IK.R", "Foot_IK.L", "Elbow_IK.R", "Elbow_IK.L" ]
-materials = {}      # All the materials found for the mech
-cockpit_materials = {}
-WGT_PREFIX = "WGT-"  # Prefix for widget objects
-ROOT_NAME = "Bip01"   # Name of the root bone.
-WGT_LAYERS = [x == 19 for x in range(0, 20)]  # Widgets go on the last scene layer.
-CTRL_LAYERS = [x == 1 for x in range(0, 32)]  # Control bones
-GEO_LAYERS = [x == 2 for x in range(0, 32)]   # Deform bones go to layer 2
-
-def strip_slash(line_split):
-    if line_split[-1][-1] == 92:  # '\' char
-        if len(line_split[-1]) == 1:
-            line_split.pop()  # remove the \ item
-        else:
-            line_split[-1] = line_split[-1][:-1]  # remove the \ from the end last number
-        return True
-    return False
-
-def get_base_dir(filepath):
-    return os.path.abspath(os.path.join(os.path.dirname(filepath), os.pardir, os.pardir, os.pardir))
-
-def get_body_dir(filepath):
-    return os.path.join(os.path.dirname(filepath), "body")
-
-def get_mech(filepath):
-    return os.path.splitext(os.path.basename(filepath))[0]
-
-def get_scaling_factor(o):
-    # Calculate the scaling factor that should get applied to bone shapes, so they are
-    # relatively close in size to the mech they are on.  Locust is 7.4, DWF is 12.9
-    local_bbox_center = 0.125 * sum((Vector(b) for b in o.bound_box), Vector())
-    global_bbox_center = o.matrix_world * local_bbox_center
-    return global_bbox_center[2]/7.4
-
-def convert_to_rotation(rotation):
-    tmp = rotation.split(',')
-    w = float(tmp[0])
-    x = float(tmp[1])
-    y = float(tmp[2])
-    z = float(tmp[3])
-    return mathutils.Quaternion((w,x,y,z))
-
-def convert_to_location(location):
-    tmp = location.split(',')
-    x = float(tmp[0])
-    y = float(tmp[1])
-    z = float(tmp[2])
-    return mathutils.Vector((x,y,z))
-
-def get_transform_matrix(rotation, location):
-    # Given a location Vector and a Quaternion rotation, get the 4x4 transform matrix.  Assumes scale is 1.
-    mat_location = mathutils.Matrix.Translation(location)
-    mat_rotation = mathutils.Matrix.Rotation(rotation.angle, 4, rotation.axis)
-    mat_scale = mathutils.Matrix.Scale(1, 4, (0.0, 0.0, 1.0))  # Identity matrix
-    mat_out = mat_location * mat_rotation * mat_scale
-    return mat_out
+
+from .utils import WGT_PREFIX, WGT_LAYERS, GEO_LAYERS, control_bones
 
 def import_armature(rig):
     try:
@@ -250,63 +151,6 @@ def flip_bone(obj, bone_name):
     else:
         raise MetarigError("Cannot flip bones outside of edit mode")
 
-def create_materials(matfile, basedir):
-    materials = {}
-    mats = ET.parse(matfile)
-    for mat in mats.iter("Material"):
-        if "Name" in mat.attrib:
-            # An actual material.  Create the material, set to nodes, clear and rebuild using the info from the material XML file.
-            name = mat.attrib["Name"]
-            matname = bpy.data.materials.new(mat.attrib["Name"])
-            materials[name] = matname
-            #print("Found material: " + matname.name)
-            matname.use_nodes = True
-            tree_nodes = matname.node_tree
-            links = tree_nodes.links
-
-            for n in tree_nodes.nodes:
-                tree_nodes.nodes.remove(n)
-
-            # Every material will have a PrincipledBSDF and Material output.  Add, place, and link.
-            shaderPrincipledBSDF = tree_nodes.nodes.new('ShaderNodeBsdfPrincipled')
-            shaderPrincipledBSDF.location =  300,500
-            shout=tree_nodes.nodes.new('ShaderNodeOutputMaterial')
-            shout.location = 500,500
-            links.new(shaderPrincipledBSDF.outputs[0], shout.inputs[0])
-            # For each Texture element, add the file and plug in to the appropriate slot on the PrincipledBSDF shader
-            for texture in mat.iter("Texture"):
-                #print("Adding texture " + texture.attrib["Map"])
-                if texture.attrib["Map"] == "Diffuse":
-                    texturefile = os.path.normpath(os.path.join(basedir, os.path.splitext(texture.attrib["File"])[0] + ".dds"))
-                    if os.path.isfile(texturefile):
-                        matDiffuse = bpy.data.images.load(filepath=texturefile, check_existing=True)
-                        shaderDiffImg = tree_nodes.nodes.new('ShaderNodeTexImage')
-                        shaderDiffImg.image=matDiffuse
-                        shaderDiffImg.location = 0,600
-                        links.new(shaderDiffImg.outputs[0], shaderPrincipledBSDF.inputs[0])
-                if texture.attrib["Map"] == "Specular":
-                    texturefile = os.path.normpath(os.path.join(basedir, os.path.splitext(texture.attrib["File"])[0] + ".dds"))
-                    if os.path.isfile(texturefile):
-                        matSpec=bpy.data.images.load(filepath=texturefile, check_existing=True)
-                        shaderSpecImg=tree_nodes.nodes.new('ShaderNodeTexImage')
-                        shaderSpecImg.color_space = 'NONE'
-                        shaderSpecImg.image=matSpec
-                        shaderSpecImg.location = 0,325
-                        links.new(shaderSpecImg.outputs[0], shaderPrincipledBSDF.inputs[5])
-                if texture.attrib["Map"] == "Bumpmap":
-                    if os.path.isfile(texturefile):
-                        texturefile = os.path.normpath(os.path.join(basedir, os.path.splitext(texture.attrib["File"])[0] + ".dds"))
-                        matNormal=bpy.data.images.load(filepath=texturefile, check_existing=True)
-                        shaderNormalImg=tree_nodes.nodes.new('ShaderNodeTexImage')
-                        shaderNormalImg.color_space = 'NONE'
-                        shaderNormalImg.image=matNormal
-                        shaderNormalImg.location = -100,0
-                        converterNormalMap=tree_nodes.nodes.new('ShaderNodeNormalMap')
-                        converterNormalMap.location = 100,0
-                        links.new(shaderNormalImg.outputs[0], converterNormalMap.inputs[1])
-                        links.new(converterNormalMap.outputs[0], shaderPrincipledBSDF.inputs[17])
-    return materials
-
 def create_widget(rig, bone_name, bone_transform_name=None):
     # From Rigify utils.py
     """ Creates an empty widget object for a bone, and returns the object.
@@ -660,7 +504,6 @@ def create_IKs():
     crcFootR.owner_space = 'LOCAL_WITH_PARENT'
     crcFootR.use_offset = True
 
-
     # Add child of constraint to hand IKs
     coc = armature.pose.bones["Hand_IK.R"].constraints.new('CHILD_OF')
     coc.target = armature
@@ -694,7 +537,6 @@ def create_IKs():
     else:
         bpose.bones['Bip01_R_Hand'].constraints['IK'].chain_count = 3
 
-
     bpose.bones['Bip01_L_Hand'].constraints.new(type='IK')
     bpose.bones['Bip01_L_Hand'].constraints['IK'].target = armature
     bpose.bones['Bip01_L_Hand'].constraints['IK'].subtarget = 'Hand_IK.L'
@@ -742,238 +584,63 @@ def create_IKs():
     # Move bones to proper layers
     set_bone_layers(armature)
 
-def import_geometry(cdffile, basedir, bodydir, mechname):
-    armature = bpy.data.objects['Armature']
-    print("Importing mech geometry...")
-    geometry = ET.parse(cdffile)
-    for geo in geometry.iter("Attachment"):
-        if not geo.attrib["AName"] == "cockpit":
-            print("Importing " + geo.attrib["AName"])
-            # Get all the attribs
-            aname    = geo.attrib["AName"]
-            rotation = convert_to_rotation(geo.attrib["Rotation"])
-            location = convert_to_location(geo.attrib["Position"])
-            bonename = geo.attrib["BoneName"].replace(' ','_')
-            binding  = os.path.join(basedir, os.path.splitext(geo.attrib["Binding"])[0] + ".dae")
-            flags    = geo.attrib["Flags"]
-            # Materials depend on the part type.  For most, <mech>_body.  Weapons is <mech>_variant.  Window/cockpit is 
-            # <mech>_window.  Also need to figure out how to deal with _generic materials after the import.
-            materialname = mechname + "_body"
-            if any(weapon in aname for weapon in weapons):
-                materialname = mechname + "_variant"
-            if "_damaged" in aname or "_prop" in aname:
-                materialname = mechname + "_body"
-            if "head_cockpit" in aname:
-                materialname = mechname + "_window"
-            # We now have all the geometry parts that need to be imported, their loc/rot, and material.  Import.
-            try:
-                bpy.ops.wm.collada_import(filepath=binding,find_chains=True,auto_connect=True)
-            except:
-                # Unable to open the file.  Probably not found (like Urbie lights, under purchasables).
-                continue
-            obj_objects = bpy.context.selected_objects[:]
-            i = 0
-            for obj in obj_objects:
-                if not obj.type == 'EMPTY':
-                    armature.select = True
-                    bpy.context.scene.objects.active = armature
-                    bone_location = bpy.context.object.pose.bones[bonename].head
-                    bone_rotation = obj.rotation_quaternion
-                    #print("    Original loc and rot: " + str(bone_location) + " and " + str(bone_rotation))
-                    #print("    Materials for " + obj.name)
-                    bpy.context.scene.objects.active = obj
-                    print("    Name: " + obj.name)
-                    # If this is a parent node, rotate/translate it. Otherwise skip it.
-                    if i == 0:
-                        matrix = get_transform_matrix(rotation, location)       # Converts the location vector and rotation quat into a 4x4 matrix.
-                        #parent this first object to the appropriate bone
-                        obj.rotation_mode = 'QUATERNION'
-                        bone = armature.data.bones[bonename]
-                        obj.parent = armature
-                        obj.parent_bone = bonename
-                        obj.parent_type = 'BONE'
-                        obj.matrix_world = matrix
-                        i = i + 1
-                    # Vertex groups
-                    vg = obj.vertex_groups.new(bonename)
-                    nverts = len(obj.data.vertices)
-                    for i in range(nverts):
-                        vg.add([i], 1.0, 'REPLACE')
-                    if len(bpy.context.object.material_slots) == 0:
-                        # no materials
-                        bpy.context.object.data.materials.append(bpy.data.materials[materialname])               # If there is no material, add a dummy mat.
-                    else:
-                        # Material corrections.  If material slot 0 contains "generic", it's a generic material, unless the key doesn't exist.  Otherwise stays variant.
-                        if "generic" in obj.material_slots[0].name:
-                            if  mechname + "_generic" in bpy.data.materials.keys():
-                                materialname = mechname + "_generic"
-                            else:
-                                materialname = "generic"            # For some reason it's just generic, not <mech>_generic
-                        else:
-                            materialname = mechname + "_variant"
-                        if "_prop" in obj.name:
-                            materialname = mechname + "_body"
-                        bpy.context.object.data.materials[0] = bpy.data.materials[materialname]
-                    obj.select = False
-
-def set_viewport_shading():
-    # Set material mode. # iterate through areas in current screen
-    for area in bpy.context.screen.areas:
-        if area.type == 'VIEW_3D':
-            for space in area.spaces: 
-                if space.type == 'VIEW_3D': 
-                    space.viewport_shade = 'MATERIAL'
-
-def set_layers():
-    # Set the layers that objects are on.
-    empties = [obj for obj in bpy.data.objects 
-               if obj.name.startswith('fire') 
-               or 'physics_proxy' in obj.name 
-               or obj.name.endswith('_fx') 
-               or obj.name.endswith('_case')
-               or obj.name.startswith('animation')]
-    for empty in empties:
-        empty.layers[4] = True
-        empty.layers[0] = False
-    # Set weapons and special geometry to layer 2
-    names = bpy.data.objects.keys()
-    for name in names:
-        if any(x in name for x in weapons):
-            bpy.data.objects[name].layers[1] = True
-            bpy.data.objects[name].layers[0] = False
-
-def import_mech(context, filepath, *, use_dds=True, use_tif=False):
-    print("Import Mech")
-    print(filepath)
-    cdffile = filepath      # The input file
-    # Split up filepath into the variables we want.
-    basedir = get_base_dir(filepath)
-    bodydir = get_body_dir(filepath)
-    mechdir = os.path.dirname(filepath)
-    mech = get_mech(filepath)
-    matfile = os.path.join(bodydir, mech + "_body.mtl")
-    cockpit_matfile = os.path.join(mechdir, "cockpit_standard", mech + 
-                                   "_a_cockpit_standard.mtl")
-
-    bpy.context.scene.render.engine = 'CYCLES'      # Set to cycles mode
-    
-    # Set material mode. # iterate through areas in current screen
-    set_viewport_shading()
-    
-    # Try to import the armature.  If we can't find it, then return error.
-    result = import_armature(os.path.join(bodydir, mech + ".dae"))   # import the armature.
-    if result == False:    
-        print("Error importing armature at: " + 
-              os.path.join(bodydir, mech + ".dae"))
-        return False
+IK_BONES = [ "Hand_IK.L", "Hand_IK.R", "Knee_IK.R", "Knee_IK.L", "Foot_IK.R", "Foot_IK.L",
+            "Elbow_IK.R", "Elbow_IK.L" ]   # Bones create_IKs adds that only drive constraints
 
-    # Create the materials.
-    materials = create_materials(matfile, basedir)
-    cockpit_materials = create_materials(cockpit_matfile, basedir)
-    # Import the geometry and assign materials.
-    geometry = import_geometry(cdffile, basedir, bodydir, mech)
-
-    # Set the layers for existing objects
-    set_layers()
-
-    # Advanced Rigging stuff.  Make bone shapes, IKs, etc.
+def create_proxy_rig(armature):
+    # FK only: the imported skeleton with no IK bones, constraints or widgets.  For mechs
+    # that only play back baked motion.
+    bpy.context.scene.objects.active = armature
+    bpy.ops.object.mode_set(mode='POSE')
+    armature["rig_type"] = 'PROXY'
+
+def remove_rig_widgets(armature):
+    for pbone in armature.pose.bones:
+        pbone.custom_shape = None
+    widget_prefix = WGT_PREFIX + armature.name + '_'
+    for obj in list(bpy.data.objects):
+        if obj.name.startswith(widget_prefix):
+            mesh = obj.data
+            bpy.data.objects.remove(obj, do_unlink=True)
+            if mesh is not None and mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+
+def convert_to_proxy_rig(armature):
+    """ Turns a full create_IKs() rig into a proxy rig in place.  If the armature has an
+        action, what the constraints do to it is baked into FK keys first.
+    """
+    bpy.context.scene.objects.active = armature
+    bpy.ops.object.mode_set(mode='POSE')
+    action = armature.animation_data.action if armature.animation_data is not None else None
+    if action is not None:
+        start, end = (int(f) for f in action.frame_range)
+        bpy.ops.nla.bake(frame_start=start, frame_end=end, only_selected=False, visual_keying=True,
+                         clear_constraints=True, use_current_action=True, bake_types={'POSE'})
+    for pbone in armature.pose.bones:
+        for constraint in list(pbone.constraints):
+            pbone.constraints.remove(constraint)
+    remove_rig_widgets(armature)
+    if action is not None:
+        for fcurve in list(action.fcurves):
+            if any('"' + name + '"' in fcurve.data_path for name in IK_BONES):
+                action.fcurves.remove(fcurve)
     bpy.ops.object.mode_set(mode='EDIT')
-    create_IKs()
-    return {'FINISHED'}
-
-class ObjectCursorArray(bpy.types.Operator):
-    """Object Cursor Array"""
-    bl_idname = "object.cursor_array"
-    bl_label = "Cursor Array"
-    bl_options = {'REGISTER', 'UNDO'}
-    total = bpy.props.IntProperty(name="Steps", default=2, min=1, max=100)
-    def execute(self, context):
-        scene = context.scene
-        cursor = scene.cursor_location
-        obj = scene.objects.active
-        for  i in range(total):
-            obj_new = obj.copy()
-            scene.objects.link(obj_new)
-            factor = i / total
-            obj_new.location = (obj.location * factor) + (cursor * (1.0 - factor))
-        return {'FINISHED'}
-
-#IOOBJOrientationHelper = orientation_helper_factory("IOOBJOrientationHelper", axis_forward='-Z', axis_up='Y')
-IOOBJOrientationHelper = orientation_helper_factory("IOOBJOrientationHelper", axis_forward='Y', axis_up='Z')
-
-class MechImporter(bpy.types.Operator, ImportHelper, IOOBJOrientationHelper):
-    """ Create a mech from MWO"""
-    bl_idname = "import_scene.mech"
-    bl_label = "Import Mech"
-    bl_options = {'PRESET', 'UNDO'}
-    filename_ext = ".cdf"
-    filter_glob = StringProperty(
-        default="*.cdf",
-        options={'HIDDEN'},
-        )
-
-    texture_type = EnumProperty(
-        name="Texture Type",
-        description = "Identify the type of texture file imported into the Texture nodes.",
-        items = (('ON', "DDS", "Reference DDS files for textures."),
-                 ('OFF', "TIF", "Reference TIF files for textures."),
-                 ),
-        )
-
-    path_mode = path_reference_mode
-    check_extension = True
-    def execute(self, context):
-        if self.texture_type == 'OFF':
-            self.use_tif = False
-        else:
-            self.use_dds = False
-        keywords = {}
-        if bpy.data.is_saved and context.user_preferences.filepaths.use_relative_paths:
-            import os
-            keywords["relpath"] = os.path.dirname(bpy.data.filepath)
-        fdir = self.properties.filepath
-        #keywords["cdffile"] = fdir
-        return import_mech(context, fdir, **keywords)
-
-    def draw(self, context):
-        layout = self.layout
-
-        row = layout.row(align = True)
-        box = layout.box()
-        box.label("Select texture type")
-        row = box.row()
-        row.prop(self, "texture_type", expand = True)
-
-def menu_func_import(self, context):
-    self.layout.operator(MechImporter.bl_idname, text="Import Mech")
-
-def menu_func(self, context):
-    self.layout.operator(ObjectCursorArray.bl_idname)
-
-def register():
-    bpy.utils.register_class(MechImporter)
-    bpy.types.VIEW3D_MT_object.append(menu_func)
-    # handle the keymap
-    #wm = bpy.context.window_manager
-    #km = wm.keyconfigs.addon.keymaps.new(name='Object Mode', space_type='EMPTY')
-    #kmi = km.keymap_items.new(ObjectCursorArray.bl_idname, 'SPACE', 'PRESS', ctrl=True, shift=True)
-    #kmi.properties.total = 4
-    #addon_keymaps.append(km)
-    bpy.types.INFO_MT_file_import.append(menu_func_import)
-
-def unregister():
-    bpy.types.INFO_MT_file_import.remove(menu_func_import)
-    #bpy.types.VIEW3D_MT_object.remove(menu_func)
-    #wm = bpy.context.window_manager
-    #for km in addon_keymaps:
-    #    wm.keyconfigs.addon.keymaps.remove(km)
-    # clear the list
-    del addon_keymaps[:]
-    bpy.utils.unregister_class(MechImporter)
-
-# This allows you to run the script directly from blenders text editor
-# to test the addon without having to install it.
-if __name__ == "__main__":
-    register()
-
+    for name in IK_BONES:
+        if name in armature.data.edit_bones:
+            armature.data.edit_bones.remove(armature.data.edit_bones[name])
+    bpy.ops.object.mode_set(mode='POSE')
+    armature["rig_type"] = 'PROXY'
 
+def benchmark_rig(frames=100):
+    """ Average milliseconds the scene takes to evaluate a frame, stepping through the
+        scene's frame range.
+    """
+    scene = bpy.context.scene
+    current = scene.frame_current
+    length = max(scene.frame_end - scene.frame_start + 1, 1)
+    start = time.perf_counter()
+    for i in range(frames):
+        scene.frame_set(scene.frame_start + i % length)
+    elapsed = time.perf_counter() - start
+    scene.frame_set(current)
+    return elapsed * 1000 / frames
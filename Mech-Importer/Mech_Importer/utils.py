@@ -0,0 +1,124 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Paths, names and transforms shared by the rest of the add-on.
+
+import os
+
+import bpy
+import mathutils
+
+# There are misspelled words (missle).  Just an FYI.
+weapons = [ "hero","missile", "missle", "narc","uac", "uac2", "uac5", "uac10", "uac20", "rac", "_lty",
+           "ac2","ac5","ac10","ac20","gauss","ppc","flamer","_mg","_lbx", "damaged", "_mount",
+           "laser","ams","_phoenix","blank","invasion", "hmg", "lmg", "lams", "hand", "barrel" ]
+control_bones = [ "Hand_IK.L", "Hand_IK.R", "Bip01", "Hip_Root", "Bip01_Pitch", "Bip01_Pelvis",
+                 "Knee_IK.R", "Knee_IK.L", "Foot_IK.R", "Foot_IK.L", "Elbow_IK.R", "Elbow_IK.L" ]
+WGT_PREFIX = "WGT-"  # Prefix for widget objects
+ROOT_NAME = "Bip01"   # Name of the root bone.
+WGT_LAYERS = [x == 19 for x in range(0, 20)]  # Widgets go on the last scene layer.
+CTRL_LAYERS = [x == 1 for x in range(0, 32)]  # Control bones
+GEO_LAYERS = [x == 2 for x in range(0, 32)]   # Deform bones go to layer 2
+
+def strip_slash(line_split):
+    if line_split[-1][-1] == 92:  # '\' char
+        if len(line_split[-1]) == 1:
+            line_split.pop()  # remove the \ item
+        else:
+            line_split[-1] = line_split[-1][:-1]  # remove the \ from the end last number
+        return True
+    return False
+
+def get_base_dir(filepath):
+    return os.path.abspath(os.path.join(os.path.dirname(filepath), os.pardir, os.pardir, os.pardir))
+
+def get_body_dir(filepath):
+    return os.path.join(os.path.dirname(filepath), "body")
+
+def get_mech(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def get_mech_name(armature):
+    # import_mech tags the armature with the mech it belongs to.
+    return armature.get("mech", armature.name)
+
+def find_mech_armature(context):
+    # The armature of the active object's mech, falling back to the last imported one.
+    obj = context.active_object
+    while obj is not None and obj.type != 'ARMATURE':
+        obj = obj.parent
+    return obj if obj is not None else bpy.data.objects.get('Armature')
+
+def is_helper_object(name):
+    # Physics proxies, effect and case helpers, animation nodes.  Imported, but not really part of the mech.
+    return (name.startswith('fire')
+            or 'physics_proxy' in name
+            or name.endswith('_fx')
+            or name.endswith('_case')
+            or name.startswith('animation'))
+
+def get_scaling_factor(o):
+    # Calculate the scaling factor that should get applied to bone shapes, so they are
+    # relatively close in size to the mech they are on.  Locust is 7.4, DWF is 12.9
+    local_bbox_center = 0.125 * sum((Vector(b) for b in o.bound_box), Vector())
+    global_bbox_center = o.matrix_world * local_bbox_center
+    return global_bbox_center[2]/7.4
+
+def convert_to_rotation(rotation):
+    tmp = rotation.split(',')
+    w = float(tmp[0])
+    x = float(tmp[1])
+    y = float(tmp[2])
+    z = float(tmp[3])
+    return mathutils.Quaternion((w,x,y,z))
+
+def convert_to_location(location):
+    tmp = location.split(',')
+    x = float(tmp[0])
+    y = float(tmp[1])
+    z = float(tmp[2])
+    return mathutils.Vector((x,y,z))
+
+def get_transform_matrix(rotation, location):
+    # Given a location Vector and a Quaternion rotation, get the 4x4 transform matrix.  Assumes scale is 1.
+    mat_location = mathutils.Matrix.Translation(location)
+    mat_rotation = mathutils.Matrix.Rotation(rotation.angle, 4, rotation.axis)
+    mat_scale = mathutils.Matrix.Scale(1, 4, (0.0, 0.0, 1.0))  # Identity matrix
+    mat_out = mat_location * mat_rotation * mat_scale
+    return mat_out
+
+def get_mech_objects(armature):
+    # Every object that hangs off the armature, directly or through another part.
+    return [obj for obj in bpy.context.scene.objects
+            if obj is not armature and armature in get_parents(obj)]
+
+def get_parents(obj):
+    parents = []
+    while obj.parent is not None:
+        obj = obj.parent
+        parents.append(obj)
+    return parents
+
+def get_descendants(obj):
+    descendants = []
+    for child in obj.children:
+        descendants.append(child)
+        descendants.extend(get_descendants(child))
+    return descendants
@@ -0,0 +1,94 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Viewport shading and display profiles for imported mechs.
+
+import bpy
+
+from .utils import WGT_PREFIX, get_mech_objects, is_helper_object, weapons
+
+def set_viewport_shading(shading='MATERIAL'):
+    # Set material mode. # iterate through areas in current screen
+    if bpy.context.screen is None:
+        return      # Running in the background, no UI.
+    for area in bpy.context.screen.areas:
+        if area.type == 'VIEW_3D':
+            for space in area.spaces: 
+                if space.type == 'VIEW_3D': 
+                    space.viewport_shade = shading
+
+# Viewport settings for imported mechs.  PERFORMANCE keeps scenes with several mechs
+# interactive; FULL is what the import produces on its own.  A profile without the scene
+# settings (texture limit, simplify) puts back the ones saved when they were last changed.
+VIEWPORT_PROFILES = {
+    'FULL': {"shading": 'MATERIAL',
+             "helper_draw_type": 'TEXTURED',    # Physics proxies, fx and case objects
+             "weapon_draw_type": 'TEXTURED',
+             "widget_draw_type": 'TEXTURED',
+             "widget_modifiers": True},
+    'PERFORMANCE': {"shading": 'SOLID',
+                    "helper_draw_type": 'BOUNDS',
+                    "weapon_draw_type": 'BOUNDS',
+                    "widget_draw_type": 'WIRE',
+                    "widget_modifiers": False,
+                    "texture_limit": 'CLAMP_1024',
+                    "simplify": True,
+                    "simplify_subdivision": 0},
+    }
+
+SCENE_SETTINGS_KEY = "mech_viewport_saved"     # Scene property holding the user's own settings
+
+def get_scene_settings(scene):
+    return {"texture_limit": bpy.context.user_preferences.system.gl_texture_limit,
+            "simplify": scene.render.use_simplify,
+            "simplify_subdivision": scene.render.simplify_subdivision}
+
+def set_scene_settings(scene, settings):
+    scene.render.use_simplify = bool(settings["simplify"])     # ID properties store it as an int
+    scene.render.simplify_subdivision = settings["simplify_subdivision"]
+    bpy.context.user_preferences.system.gl_texture_limit = settings["texture_limit"]
+
+def apply_viewport_profile(armature, profile='PERFORMANCE'):
+    """ Applies one of VIEWPORT_PROFILES to the mech rigged to armature, its bone widgets and
+        the 3D views.  The texture limit is a user preference and simplify a scene setting, so
+        they affect every mech; the user's values are restored by switching back to FULL.
+    """
+    settings = VIEWPORT_PROFILES[profile]
+    for obj in get_mech_objects(armature):
+        if is_helper_object(obj.name):
+            obj.draw_type = settings["helper_draw_type"]
+        elif any(weapon in obj.name for weapon in weapons):
+            obj.draw_type = settings["weapon_draw_type"]
+    widget_prefix = WGT_PREFIX + armature.name + '_'
+    for obj in bpy.data.objects:
+        if obj.name.startswith(widget_prefix):
+            obj.draw_type = settings["widget_draw_type"]
+            for modifier in obj.modifiers:
+                modifier.show_viewport = settings["widget_modifiers"]
+    scene = bpy.context.scene
+    if "texture_limit" in settings:
+        if SCENE_SETTINGS_KEY not in scene:
+            scene[SCENE_SETTINGS_KEY] = get_scene_settings(scene)
+        set_scene_settings(scene, settings)
+    elif SCENE_SETTINGS_KEY in scene:
+        set_scene_settings(scene, scene[SCENE_SETTINGS_KEY].to_dict())
+        del scene[SCENE_SETTINGS_KEY]
+    set_viewport_shading(settings["shading"])
+    armature["viewport_profile"] = profile
@@ -0,0 +1,50 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+#
+
+# Times enabling the add-on and lists the heavy modules that were loaded by it:
+#   blender -b --factory-startup -P measure_startup.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("xml.etree.ElementTree", "mmap", "hashlib", "concurrent.futures", "progress_report")
+
+def main():
+    before = set(sys.modules)
+    start = time.perf_counter()
+    import Mech_Importer
+    imported = time.perf_counter()
+    Mech_Importer.register()
+    registered = time.perf_counter()
+    Mech_Importer.unregister()
+    unregistered = time.perf_counter()
+    loaded = sorted(name for name in set(sys.modules) - before
+                    if name.startswith("Mech_Importer.") or name in HEAVY_MODULES)
+    print("import:     {0:.2f} ms".format((imported - start) * 1000))
+    print("register:   {0:.2f} ms".format((registered - imported) * 1000))
+    print("unregister: {0:.2f} ms".format((unregistered - registered) * 1000))
+    print("modules loaded: " + (", ".join(loaded) if loaded else "none"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Stand-in for cgf-converter, for testing the conversion step without the real tool.
+#   python fake_converter.py <source>
+# What it does depends on what the source file says: "fail" exits with an error, "no-output"
+# exits cleanly without writing anything, "hang" never finishes.  Anything else is converted.
+
+import os
+import sys
+import time
+
+def main(source):
+    with open(source) as f:
+        behaviour = f.read().strip()
+    if behaviour == "fail":
+        print("Reading " + source)
+        print("Unable to read chunk table")
+        return 3
+    if behaviour == "hang":
+        time.sleep(60)
+    if behaviour != "no-output":
+        with open(os.path.splitext(source)[0] + ".dae", 'w') as f:
+            f.write("<COLLADA/>")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1]))
@@ -0,0 +1,99 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Mech_Importer.convert import convert_sources, get_dae_path
+
+FAKE_CONVERTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_converter.py")
+COMMAND = '"{0}" "{1}" "{{source}}"'.format(sys.executable, FAKE_CONVERTER)
+
+class ConvertSourcesTest(unittest.TestCase):
+    def setUp(self):
+        self.basedir = tempfile.mkdtemp(prefix="mech_convert_")
+
+    def tearDown(self):
+        shutil.rmtree(self.basedir, ignore_errors=True)
+
+    def make_source(self, name, behaviour="convert"):
+        source = os.path.join(self.basedir, name)
+        with open(source, 'w') as f:
+            f.write(behaviour)
+        return source
+
+    def test_converts_missing_dae(self):
+        source = self.make_source("part.cgf")
+        summary = convert_sources([source], self.basedir, COMMAND)
+        self.assertEqual(summary["converted"], 1)
+        self.assertEqual(summary["results"][0]["returncode"], 0)
+        self.assertTrue(os.path.exists(get_dae_path(source)))
+
+    def test_skips_up_to_date(self):
+        source = self.make_source("part.cgf", "fail")
+        with open(get_dae_path(source), 'w') as f:
+            f.write("<COLLADA/>")
+        os.utime(source, (1000, 1000))
+        summary = convert_sources([source], self.basedir, COMMAND)
+        self.assertEqual(summary["up_to_date"], 1)
+        self.assertEqual(summary["results"], [])
+
+    def test_reconverts_older_dae(self):
+        source = self.make_source("part.cgf")
+        with open(get_dae_path(source), 'w') as f:
+            f.write("")
+        os.utime(get_dae_path(source), (1000, 1000))
+        summary = convert_sources([source], self.basedir, COMMAND)
+        self.assertEqual(summary["converted"], 1)
+
+    def test_records_exit_code_and_last_line(self):
+        source = self.make_source("broken.cgf", "fail")
+        result = convert_sources([source], self.basedir, COMMAND)["results"][0]
+        self.assertEqual(result["returncode"], 3)
+        self.assertEqual(result["error"], "Unable to read chunk table")
+
+    def test_no_dae_written(self):
+        source = self.make_source("empty.cgf", "no-output")
+        result = convert_sources([source], self.basedir, COMMAND)["results"][0]
+        self.assertEqual(result["returncode"], 0)
+        self.assertEqual(result["error"], "no .dae written")
+
+    def test_timeout(self):
+        source = self.make_source("stuck.cgf", "hang")
+        summary = convert_sources([source], self.basedir, COMMAND, timeout=1)
+        result = summary["results"][0]
+        self.assertEqual(summary["failed"], 1)
+        self.assertIsNone(result["returncode"])
+        self.assertIn("timed out", result["error"])
+        self.assertLess(result["seconds"], 30)
+
+    def test_runs_jobs_in_parallel(self):
+        sources = [self.make_source("part%d.cgf" % i) for i in range(4)]
+        summary = convert_sources(sources, self.basedir, COMMAND, jobs=4)
+        self.assertEqual(summary["converted"], 4)
+        self.assertEqual(summary["failed"], 0)
+
+if __name__ == "__main__":
+    unittest.main()